@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Compare lock-step batch scheduling with the sliding window on a simulated group.
+
+Each simulated bulb answers after a fixed latency; slow bulbs stand in for
+unplugged bulbs that only fail after their retries are exhausted.
+
+Usage:
+    python bench_scheduling.py '{"bulbs": 60, "slow_bulbs": 2, "latency": 0.03, "slow_latency": 2.0}'
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import *
+from scheduler import run_batched, run_windowed
+from timings import percentile
+
+# Configure logging
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCENARIO = {
+    "bulbs": 60,
+    "slow_bulbs": 2,
+    "latency": 0.03,
+    "slow_latency": 2.0
+}
+
+async def run_scenario(mode: str, scenario: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one scheduling mode over the simulated bulbs and collect completion times."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_CONNECTIONS)
+    # Spread the slow bulbs through the list so they land in different batches
+    step = max(1, scenario["bulbs"] // max(1, scenario["slow_bulbs"]))
+    slow = {i * step for i in range(scenario["slow_bulbs"])}
+    completion_times: List[float] = []
+    start = time.perf_counter()
+
+    async def simulated_operation(index: int) -> Dict[str, Any]:
+        async with semaphore:
+            await asyncio.sleep(scenario["slow_latency"] if index in slow else scenario["latency"])
+        completion_times.append(time.perf_counter() - start)
+        return {"success": index not in slow, "ip": f"bulb-{index}"}
+
+    items = list(range(scenario["bulbs"]))
+    if mode == 'batch':
+        await run_batched(items, simulated_operation)
+    else:
+        await run_windowed(items, simulated_operation)
+
+    total = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "total_seconds": round(total, 3),
+        "p50_completion_seconds": round(percentile(completion_times, 50), 3),
+        "p95_completion_seconds": round(percentile(completion_times, 95), 3),
+        "max_completion_seconds": round(max(completion_times), 3)
+    }
+
+async def main():
+    scenario = dict(DEFAULT_SCENARIO)
+    if len(sys.argv) > 1:
+        scenario.update(json.loads(sys.argv[1]))
+
+    results = [
+        await run_scenario('batch', scenario),
+        await run_scenario('window', scenario)
+    ]
+    print(json.dumps({
+        "scenario": scenario,
+        "batch_size": BATCH_SIZE,
+        "window_size": WINDOW_SIZE,
+        "results": results
+    }, indent=2))
+
+if __name__ == '__main__':
+    asyncio.run(main())
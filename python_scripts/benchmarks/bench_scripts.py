@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Benchmark the light scripts end to end against an emulated bulb fleet.
+
+For every fleet size a wiz_emulator.py fleet is started on loopback. Each
+script then runs as its own process, exactly as the Node side calls it, with
+streaming on so every per-light result is timestamped as it arrives. The
+report gives throughput and p50/p95/p99 completion times per script and fleet
+size, measured from process start, so interpreter startup is included.
+
+Every run gets a fresh state directory, so the bulb cache, health board and
+pilot cache from one run never speed up or skip work in the next.
+
+Usage:
+    python bench_scripts.py '{"sizes": [10, 100, 1000], "latency": 0.005, "jitter": 0.005, "loss": 0.01, "dead": 0}'
+    python bench_scripts.py '{"sizes": [100], "scripts": ["turn_on_lights", "set_lights_pilot"], "repeat": 3}'
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import logging
+import tempfile
+from typing import Dict, Any, List, Callable, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timings import percentile
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.dirname(BENCHMARK_DIR)
+
+DEFAULT_SUITE = {
+    "sizes": [10, 100, 1000],
+    "scripts": None,
+    "latency": 0.005,
+    "jitter": 0.005,
+    "loss": 0.0,
+    "dead": 0,
+    "repeat": 1,
+    "deadline": 25
+}
+
+# Script name -> builder of its input from the fleet's IPs
+SCRIPTS: Dict[str, Callable[[List[str]], Dict[str, Any]]] = {
+    "turn_on_lights": lambda ips: {"ips": ips},
+    "turn_off_lights": lambda ips: {"ips": ips},
+    "set_lights_color": lambda ips: {"ips": ips, "color": [255, 0, 0]},
+    "set_lights_warm_white": lambda ips: {"ips": ips, "intensity": 128},
+    "set_lights_cold_white": lambda ips: {"ips": ips, "intensity": 128},
+    "set_lights_pilot": lambda ips: {"ips": ips, "pilot": {"state": True, "brightness": 102, "colortemp": 2700}},
+    "set_lights_bulk": lambda ips: {"items": [
+        {"ip": ip, "rgb": [255, 0, 0]} if index % 2 else {"ip": ip, "colortemp": 4000}
+        for index, ip in enumerate(ips)
+    ]},
+    "get_lights": lambda ips: {}
+}
+
+async def start_fleet(suite: Dict[str, Any], size: int) -> Tuple[asyncio.subprocess.Process, Dict[str, Any]]:
+    """Start an emulator process and wait until every bulb is listening."""
+    fleet = {key: suite[key] for key in ("latency", "jitter", "loss", "dead")}
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(BENCHMARK_DIR, 'wiz_emulator.py'), json.dumps({**fleet, "bulbs": size}),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE
+    )
+    line = await process.stdout.readline()
+    if not line:
+        raise RuntimeError("Emulator exited before it was ready")
+    return process, json.loads(line)
+
+async def stop_fleet(process: asyncio.subprocess.Process) -> None:
+    """Close the emulator's stdin so it shuts down."""
+    process.stdin.close()
+    await process.wait()
+
+async def run_script(script: str, data: Dict[str, Any], env: Dict[str, str]) -> Dict[str, Any]:
+    """Run one script with streaming on and time every result line it prints."""
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(SCRIPTS_DIR, f'{script}.py'), json.dumps({**data, "stream": True}),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+        env=env
+    )
+    completion_times: List[float] = []
+    successful = 0
+    summary: Dict[str, Any] = {}
+    async for line in process.stdout:
+        elapsed = time.perf_counter() - start
+        try:
+            payload = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if payload.get("type") == "result":
+            completion_times.append(elapsed)
+            successful += bool(payload.get("success"))
+        elif payload.get("type") == "summary":
+            summary = payload
+    await process.wait()
+    total = time.perf_counter() - start
+
+    result = {
+        "script": script,
+        "total_seconds": round(total, 3),
+        "results": len(completion_times),
+        "successful": successful,
+        "throughput_per_second": round(len(completion_times) / total, 1) if total else 0.0
+    }
+    if completion_times:
+        result.update({
+            "p50_completion_seconds": round(percentile(completion_times, 50), 3),
+            "p95_completion_seconds": round(percentile(completion_times, 95), 3),
+            "p99_completion_seconds": round(percentile(completion_times, 99), 3)
+        })
+    elif summary.get("message"):
+        result["message"] = summary["message"]
+    return result
+
+async def run_size(suite: Dict[str, Any], size: int, scripts: List[str]) -> List[Dict[str, Any]]:
+    """Run every script against one fleet size."""
+    process, fleet = await start_fleet(suite, size)
+    runs = []
+    try:
+        for script in scripts:
+            for _ in range(suite["repeat"]):
+                with tempfile.TemporaryDirectory() as state_dir:
+                    env = {
+                        **os.environ,
+                        "LIGHTS_STATE_DIR": state_dir,
+                        "BROADCAST_ADDRESS": fleet["broadcast_address"],
+                        "REQUEST_DEADLINE": str(suite["deadline"])
+                    }
+                    run = await run_script(script, SCRIPTS[script](fleet["ips"]), env)
+                runs.append({"bulbs": size, **run})
+                logger.info(f"{size} bulbs, {script}: {run['total_seconds']}s")
+    finally:
+        await stop_fleet(process)
+    return runs
+
+async def main():
+    suite = dict(DEFAULT_SUITE)
+    if len(sys.argv) > 1:
+        suite.update(json.loads(sys.argv[1]))
+    scripts = suite["scripts"] or list(SCRIPTS)
+    unknown = [script for script in scripts if script not in SCRIPTS]
+    if unknown:
+        raise SystemExit(f"Unknown scripts: {', '.join(unknown)}")
+
+    runs = []
+    for size in suite["sizes"]:
+        runs.extend(await run_size(suite, size, scripts))
+
+    print(json.dumps({
+        "suite": {**suite, "scripts": scripts},
+        "results": runs
+    }, indent=2))
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Check that the script entry points stay within their startup budget.
+
+Each entry point is imported in a fresh interpreter under `-X importtime`,
+as many times as `runs`; the fastest run counts, so a busy machine does not
+fail the check. A script fails when its import time exceeds its budget or
+when it pulls in a module that must stay off the startup path (NumPy,
+thread pools, python-dotenv under Node, tempfile before anything is saved).
+
+The environment mimics a spawn from Node, which already carries
+BROADCAST_ADDRESS, so config.py skips python-dotenv.
+
+Usage:
+    python bench_startup.py
+    python bench_startup.py '{"runs": 10, "default_ms": 120, "scripts": {"light_worker": 150}}'
+
+Exits with status 1 when any script is over budget.
+"""
+import sys
+import os
+import json
+import subprocess
+from typing import Dict, Any, List, Set, Tuple
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.dirname(BENCHMARK_DIR)
+
+# Scripts spawned per request by the Node side, plus the long-lived ones
+ENTRY_POINTS = [
+    'get_lights',
+    'turn_on_lights',
+    'turn_off_lights',
+    'set_lights_color',
+    'set_lights_warm_white',
+    'set_lights_cold_white',
+    'set_lights_pilot',
+    'set_lights_bulk',
+    'transition_lights',
+    'effect_lights',
+    'state_tracker',
+    'light_worker'
+]
+
+DEFAULT_BUDGET = {
+    "runs": 5,
+    "default_ms": 150,
+    "scripts": {
+        "effect_lights": 300
+    },
+    "forbidden": ["numpy", "concurrent.futures.thread", "dotenv", "tempfile"],
+    "allowed": {
+        "effect_lights": ["numpy"]
+    }
+}
+
+def import_profile(script: str) -> Tuple[float, Set[str]]:
+    """Import script in a fresh interpreter and return its cumulative import time (ms) and imported modules."""
+    env = {**os.environ, "BROADCAST_ADDRESS": os.environ.get("BROADCAST_ADDRESS", "255.255.255.255")}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {script}'],
+        cwd=SCRIPTS_DIR,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {script} failed: {result.stderr.strip().splitlines()[-1]}")
+
+    cumulative_us = None
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        if name.strip() == script:
+            cumulative_us = int(cumulative)
+    return cumulative_us / 1000, modules
+
+def check_script(script: str, budget: Dict[str, Any]) -> Dict[str, Any]:
+    """Profile one entry point against its budget."""
+    runs = [import_profile(script) for _ in range(budget["runs"])]
+    import_ms = min(ms for ms, _ in runs)
+    modules = set().union(*(imported for _, imported in runs))
+    allowed = set(budget["allowed"].get(script, []))
+    forbidden = sorted(
+        name for name in budget["forbidden"]
+        if name not in allowed and name in modules
+    )
+    budget_ms = budget["scripts"].get(script, budget["default_ms"])
+    return {
+        "script": script,
+        "import_ms": round(import_ms, 1),
+        "budget_ms": budget_ms,
+        "forbidden_imports": forbidden,
+        "ok": import_ms <= budget_ms and not forbidden
+    }
+
+def main() -> int:
+    budget = dict(DEFAULT_BUDGET)
+    if len(sys.argv) > 1:
+        overrides = json.loads(sys.argv[1])
+        budget.update({key: value for key, value in overrides.items() if key != "scripts"})
+        budget["scripts"] = {**DEFAULT_BUDGET["scripts"], **overrides.get("scripts", {})}
+
+    results: List[Dict[str, Any]] = [check_script(script, budget) for script in ENTRY_POINTS]
+    print(json.dumps({
+        "budget": budget,
+        "results": results,
+        "ok": all(result["ok"] for result in results)
+    }, indent=2))
+    return 0 if all(result["ok"] for result in results) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Run a fleet of virtual WiZ bulbs on loopback addresses.
+
+Every bulb binds its own 127.x.y.z address on the WiZ port and answers
+getPilot, setPilot, getSystemConfig, getModelConfig, getUserConfig and
+registration like a real bulb, after a configurable latency plus jitter.
+Requests are dropped with probability `loss`, and `dead` bulbs never answer.
+A listener on the fleet's broadcast address fans discovery registrations out
+to every bulb, so get_lights.py finds the fleet when BROADCAST_ADDRESS points
+at it. Bulbs registered for push updates get a syncPilot after each change.
+
+Loopback aliases beyond 127.0.0.1 work out of the box on Linux; other
+platforms need the addresses added to the loopback interface first.
+
+Usage:
+    python wiz_emulator.py '{"bulbs": 100, "latency": 0.005, "jitter": 0.005, "loss": 0.01, "dead": 2}'
+
+Prints one JSON line with the bulb IPs and broadcast address once every bulb
+is listening, then serves until stdin is closed.
+"""
+import sys
+import json
+import random
+import asyncio
+import logging
+import ipaddress
+import socket
+import resource
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+WIZ_PORT = 38899
+PUSH_PORT = 38900
+
+DEFAULT_FLEET = {
+    "bulbs": 10,
+    "network": "127.77.0.0",
+    "latency": 0.005,
+    "jitter": 0.005,
+    "loss": 0.0,
+    "dead": 0,
+    "seed": None
+}
+
+@dataclass
+class VirtualBulb:
+    ip: str
+    mac: str
+    dead: bool = False
+    pilot: Dict[str, Any] = field(default_factory=lambda: {"state": False, "sceneId": 0, "dimming": 100, "temp": 2700})
+    push_targets: set = field(default_factory=set)
+
+    def handle(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply one request to the bulb and return its reply."""
+        if method == 'getPilot':
+            return {"method": method, "env": "pro", "result": {"mac": self.mac, "rssi": -55, **self.pilot}}
+        if method == 'setPilot':
+            if any(key in params for key in ('r', 'g', 'b')):
+                self.pilot.pop('temp', None)
+            if 'temp' in params:
+                for key in ('r', 'g', 'b', 'c', 'w'):
+                    self.pilot.pop(key, None)
+            self.pilot.update(params)
+            return {"method": method, "env": "pro", "result": {"success": True}}
+        if method == 'getSystemConfig':
+            return {"method": method, "env": "pro", "result": {
+                "mac": self.mac,
+                "homeId": 1,
+                "roomId": 1,
+                "moduleName": "ESP01_SHRGB1C_31",
+                "fwVersion": "1.25.0",
+                "typeId": 0
+            }}
+        if method == 'getModelConfig':
+            return {"method": method, "env": "pro", "result": {"cctRange": [2200, 2700, 6500, 6500], "nowc": 2, "wcr": 30}}
+        if method == 'getUserConfig':
+            return {"method": method, "env": "pro", "result": {"whiteRange": [2200, 6500], "extRange": [2200, 6500]}}
+        if method == 'registration':
+            if params.get('register') and params.get('phoneIp'):
+                self.push_targets.add(params['phoneIp'])
+            return {"method": method, "env": "pro", "result": {"mac": self.mac, "success": True}}
+        return {"method": method, "env": "pro", "error": {"code": -32601, "message": "Method not found"}}
+
+    def sync_message(self) -> Dict[str, Any]:
+        """Push update a real bulb sends to registered phones after a change."""
+        return {"method": "syncPilot", "env": "pro", "params": {"mac": self.mac, "rssi": -55, "src": "udp", **self.pilot}}
+
+class BulbProtocol(asyncio.DatagramProtocol):
+    """Serve one virtual bulb on its own loopback address."""
+
+    def __init__(self, bulb: VirtualBulb, fleet: 'Emulator'):
+        self.bulb = bulb
+        self.fleet = fleet
+        self.transport: Optional[asyncio.DatagramTransport] = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        try:
+            request = json.loads(data)
+        except json.JSONDecodeError:
+            return
+        self.fleet.reply(self, request, addr)
+
+class DiscoveryProtocol(asyncio.DatagramProtocol):
+    """Fan registration broadcasts out to every bulb in the fleet."""
+
+    def __init__(self, fleet: 'Emulator'):
+        self.fleet = fleet
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        try:
+            request = json.loads(data)
+        except json.JSONDecodeError:
+            return
+        if request.get('method') != 'registration':
+            return
+        for protocol in self.fleet.protocols:
+            self.fleet.reply(protocol, request, addr)
+
+def bind_socket(ip: str) -> socket.socket:
+    """Bind a UDP socket on the WiZ port that can coexist with discovery's wildcard socket."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # pywizlight binds discovery to 0.0.0.0 on the same port with SO_REUSEADDR
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((ip, WIZ_PORT))
+    sock.setblocking(False)
+    return sock
+
+class Emulator:
+    """A fleet of virtual bulbs sharing one latency, jitter and loss profile."""
+
+    def __init__(
+        self,
+        bulbs: int = DEFAULT_FLEET["bulbs"],
+        network: str = DEFAULT_FLEET["network"],
+        latency: float = DEFAULT_FLEET["latency"],
+        jitter: float = DEFAULT_FLEET["jitter"],
+        loss: float = DEFAULT_FLEET["loss"],
+        dead: int = DEFAULT_FLEET["dead"],
+        seed: Optional[int] = DEFAULT_FLEET["seed"]
+    ):
+        base = ipaddress.IPv4Address(network)
+        # Spread the dead bulbs through the fleet so they land in different windows
+        step = max(1, bulbs // max(1, dead))
+        dead_indexes = {i * step for i in range(dead)}
+        self.bulbs = [
+            VirtualBulb(
+                ip=str(base + 1 + index),
+                mac=f"a8bb50{index:06x}",
+                dead=index in dead_indexes
+            )
+            for index in range(bulbs)
+        ]
+        self.broadcast_address = str(ipaddress.IPv4Network(f"{network}/16", strict=False).broadcast_address)
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.random = random.Random(seed)
+        self.protocols: List[BulbProtocol] = []
+        self.transports: List[asyncio.BaseTransport] = []
+
+    @property
+    def ips(self) -> List[str]:
+        return [bulb.ip for bulb in self.bulbs]
+
+    def reply(self, protocol: BulbProtocol, request: Dict[str, Any], addr: Tuple[str, int]) -> None:
+        """Answer a request after the fleet's latency, unless the bulb is dead or the packet is lost."""
+        bulb = protocol.bulb
+        if bulb.dead or self.random.random() < self.loss:
+            return
+        response = bulb.handle(request.get('method'), request.get('params') or {})
+        delay = self.latency + self.random.uniform(0, self.jitter)
+
+        def send() -> None:
+            if protocol.transport is None or protocol.transport.is_closing():
+                return
+            protocol.transport.sendto(json.dumps(response).encode(), addr)
+            if request.get('method') == 'setPilot':
+                for target in bulb.push_targets:
+                    protocol.transport.sendto(json.dumps(bulb.sync_message()).encode(), (target, PUSH_PORT))
+
+        asyncio.get_running_loop().call_later(delay, send)
+
+    async def start(self) -> None:
+        """Bind every bulb and the discovery listener."""
+        # Each bulb holds a socket, so large fleets need more than the default descriptor limit
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        wanted = len(self.bulbs) + 64
+        if soft < wanted and (hard == resource.RLIM_INFINITY or soft < hard):
+            resource.setrlimit(resource.RLIMIT_NOFILE, (wanted if hard == resource.RLIM_INFINITY else min(wanted, hard), hard))
+
+        loop = asyncio.get_running_loop()
+        for bulb in self.bulbs:
+            transport, protocol = await loop.create_datagram_endpoint(
+                lambda bulb=bulb: BulbProtocol(bulb, self),
+                sock=bind_socket(bulb.ip)
+            )
+            self.transports.append(transport)
+            self.protocols.append(protocol)
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: DiscoveryProtocol(self),
+            sock=bind_socket(self.broadcast_address)
+        )
+        self.transports.append(transport)
+
+    async def stop(self) -> None:
+        """Close every socket."""
+        for transport in self.transports:
+            transport.close()
+        self.transports.clear()
+        self.protocols.clear()
+
+    async def __aenter__(self) -> 'Emulator':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+async def main():
+    fleet = dict(DEFAULT_FLEET)
+    if len(sys.argv) > 1:
+        fleet.update(json.loads(sys.argv[1]))
+
+    async with Emulator(**fleet) as emulator:
+        print(json.dumps({
+            "ips": emulator.ips,
+            "dead": [bulb.ip for bulb in emulator.bulbs if bulb.dead],
+            "broadcast_address": emulator.broadcast_address
+        }), flush=True)
+        # Serve until the parent closes stdin
+        await asyncio.get_running_loop().run_in_executor(None, sys.stdin.read)
+
+if __name__ == '__main__':
+    asyncio.run(main())
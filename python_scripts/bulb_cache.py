@@ -0,0 +1,88 @@
+import time
+import logging
+from typing import Dict, Any, List, Optional
+from config import *
+from json_store import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+def describe_bulb_type(bulb_type) -> Dict[str, Any]:
+    """Build the static part of a bulb description from a pywizlight BulbType."""
+    return {
+        "features": {
+            "brightness": bulb_type.features.brightness,
+            "color": bulb_type.features.color,
+            "color_tmp": bulb_type.features.color_tmp,
+            "effect": bulb_type.features.effect
+        },
+        "kelvin_range": {
+            "max": bulb_type.kelvin_range.max,
+            "min": bulb_type.kelvin_range.min
+        },
+        "name": bulb_type.name
+    }
+
+class BulbTypeCache:
+    """On-disk cache of bulb metadata that never changes for a bulb, keyed by MAC."""
+
+    def __init__(self, path: str = BULB_CACHE_FILE, ttl: int = BULB_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.entries: Dict[str, Dict[str, Any]] = load_json(path, {})
+        # When entries were invalidated, so save() drops older copies other processes wrote
+        self.cleared_at: Optional[float] = None
+        self.removed: Dict[str, float] = {}
+        self.dirty = False
+
+    def get(self, mac: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return the cached description for a MAC, or None when missing or expired."""
+        if not mac or mac not in self.entries:
+            return None
+        entry = self.entries[mac]
+        if time.time() - entry.get("cached_at", 0) > self.ttl:
+            return None
+        return entry["bulb"]
+
+    def put(self, mac: Optional[str], bulb: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache a bulb description and return it."""
+        if mac:
+            self.entries[mac] = {"cached_at": time.time(), "bulb": bulb}
+            self.dirty = True
+        return bulb
+
+    def invalidate(self, macs: Optional[List[str]] = None) -> None:
+        """Drop the given MACs from the cache, or every entry when macs is None."""
+        if macs is None:
+            logger.info("Invalidating the whole bulb type cache")
+            self.entries.clear()
+            self.cleared_at = time.time()
+        else:
+            for mac in macs:
+                self.entries.pop(mac, None)
+                self.removed[mac] = time.time()
+        self.dirty = True
+
+    def save(self) -> None:
+        """Merge with entries other processes wrote since loading, newest first, and save.
+
+        Entries invalidated here stay dropped unless another process cached
+        the bulb again afterwards.
+        """
+        if not self.dirty:
+            return
+        try:
+            merged = {
+                mac: entry
+                for mac, entry in load_json(self.path, {}).items()
+                if entry.get("cached_at", 0) > max(self.cleared_at or 0, self.removed.get(mac, 0))
+            }
+            for mac, entry in self.entries.items():
+                if mac not in merged or merged[mac].get("cached_at", 0) <= entry.get("cached_at", 0):
+                    merged[mac] = entry
+            save_json(self.path, merged)
+            self.entries = merged
+            self.cleared_at = None
+            self.removed = {}
+            self.dirty = False
+        except OSError as e:
+            logger.warning(f"Could not save bulb type cache: {str(e)}")
@@ -0,0 +1,147 @@
+import time
+import logging
+from typing import Dict, Any, Optional
+from config import *
+from json_store import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+# Breaker states reported by HealthBoard.state
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class BulbUnhealthyError(Exception):
+    """Raised instead of contacting a bulb whose circuit breaker is open."""
+
+    def __init__(self, ip: str):
+        super().__init__("skipped: unhealthy")
+        self.ip = ip
+
+class HealthBoard:
+    """Persisted per-bulb health scoreboard backing a simple circuit breaker, keyed by IP.
+
+    After BREAKER_THRESHOLD consecutive failed operations a bulb's breaker opens
+    and it is skipped outright. Once BREAKER_COOLDOWN has passed the breaker is
+    half-open: the next operation gets a single short probe, and a success
+    closes the breaker again.
+
+    The board also keeps a smoothed RTT and RTT variance per bulb (as TCP does
+    for its retransmission timeout), from which rto() derives attempt timeouts,
+    and the last RTT_SAMPLES samples from which hedge_delay() takes the p95.
+    """
+
+    def __init__(
+        self,
+        path: str = HEALTH_FILE,
+        threshold: int = BREAKER_THRESHOLD,
+        cooldown: float = BREAKER_COOLDOWN
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.entries: Dict[str, Dict[str, Any]] = load_json(path, {})
+        self.dirty = False
+
+    def entry(self, ip: str) -> Dict[str, Any]:
+        """Return the health entry for a bulb, creating an empty one if needed."""
+        if ip not in self.entries:
+            self.entries[ip] = {
+                "consecutive_failures": 0,
+                "last_success": None,
+                "last_failure": None,
+                "rtt": None,
+                "srtt": None,
+                "rttvar": None,
+                "samples": [],
+                "updated_at": 0
+            }
+        return self.entries[ip]
+
+    def touch(self, entry: Dict[str, Any]) -> None:
+        """Note that an entry changed, so save() prefers it over older copies on disk."""
+        entry["updated_at"] = time.time()
+        self.dirty = True
+
+    def state(self, ip: str) -> str:
+        """Return the breaker state for a bulb."""
+        entry = self.entries.get(ip)
+        if entry is None or entry["consecutive_failures"] < self.threshold:
+            return CLOSED
+        if time.time() - (entry["last_failure"] or 0) < self.cooldown:
+            return OPEN
+        return HALF_OPEN
+
+    def record_success(self, ip: str, rtt: Optional[float] = None, sample: bool = True) -> None:
+        """Close the breaker for a bulb that answered, remembering its round-trip time.
+
+        Pass sample=False when the reply may belong to an earlier, retried attempt
+        (Karn's rule): the RTT is then stored but not fed into the estimate.
+        """
+        entry = self.entry(ip)
+        if entry["consecutive_failures"] >= self.threshold:
+            logger.info(f"Bulb {ip} is responding again, closing its breaker")
+        entry["consecutive_failures"] = 0
+        entry["last_success"] = time.time()
+        if rtt is not None:
+            entry["rtt"] = rtt
+            if sample:
+                self.update_rtt(entry, rtt)
+        self.touch(entry)
+
+    def update_rtt(self, entry: Dict[str, Any], rtt: float) -> None:
+        """Fold an RTT sample into the smoothed RTT and variance (RFC 6298)."""
+        entry["samples"] = (entry.get("samples", []) + [rtt])[-RTT_SAMPLES:]
+        if entry.get("srtt") is None:
+            entry["srtt"] = rtt
+            entry["rttvar"] = rtt / 2
+        else:
+            entry["rttvar"] = (1 - RTT_BETA) * entry["rttvar"] + RTT_BETA * abs(entry["srtt"] - rtt)
+            entry["srtt"] = (1 - RTT_ALPHA) * entry["srtt"] + RTT_ALPHA * rtt
+
+    def record_timeout(self, ip: str) -> None:
+        """Widen the RTT variance after a timed-out attempt so later timeouts back off."""
+        entry = self.entry(ip)
+        if entry.get("rttvar") is not None:
+            entry["rttvar"] = min(entry["rttvar"] * 2, CONNECTION_TIMEOUT)
+            self.touch(entry)
+
+    def rto(self, ip: str) -> Optional[float]:
+        """Return the learned attempt timeout for a bulb, or None without RTT history."""
+        entry = self.entries.get(ip)
+        if not ADAPTIVE_TIMEOUTS or entry is None or entry.get("srtt") is None:
+            return None
+        rto = entry["srtt"] + 4 * entry["rttvar"]
+        return max(RTO_MIN, min(rto, CONNECTION_TIMEOUT))
+
+    def hedge_delay(self, ip: str) -> Optional[float]:
+        """Return the bulb's p95 RTT over recent samples, or None with too few samples."""
+        entry = self.entries.get(ip)
+        samples = sorted(entry.get("samples", [])) if entry else []
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+    def record_failure(self, ip: str) -> None:
+        """Count a failed operation and open the breaker once the threshold is reached."""
+        entry = self.entry(ip)
+        entry["consecutive_failures"] += 1
+        entry["last_failure"] = time.time()
+        if entry["consecutive_failures"] == self.threshold:
+            logger.warning(f"Bulb {ip} failed {self.threshold} times in a row, opening its breaker")
+        self.touch(entry)
+
+    def save(self) -> None:
+        """Merge with entries other processes wrote since loading, newest first, and save."""
+        if not self.dirty:
+            return
+        try:
+            merged = load_json(self.path, {})
+            for ip, entry in self.entries.items():
+                if ip not in merged or merged[ip].get("updated_at", 0) <= entry.get("updated_at", 0):
+                    merged[ip] = entry
+            save_json(self.path, merged)
+            self.entries = merged
+            self.dirty = False
+        except OSError as e:
+            logger.warning(f"Could not save bulb health scoreboard: {str(e)}")
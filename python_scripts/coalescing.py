@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import List, Dict, Any, Callable, Awaitable, Tuple, Optional
+
+logger = logging.getLogger(__name__)
+
+class Coalescer:
+    """Latest-wins bookkeeping per (bulb, property) for long-lived processes.
+
+    Each command claims its bulbs when it arrives. A claim cancels the bulb's
+    in-flight operation from an older command, and older operations that have
+    not started yet are dropped when their turn comes, so every bulb ends up
+    in the most recently requested state.
+    """
+
+    def __init__(self):
+        self.generations: Dict[Tuple[str, str], int] = {}
+        self.running: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    def claim(self, ips: List[str], prop: str = 'pilot') -> Dict[str, int]:
+        """Make the calling command the latest for these bulbs and return its generations."""
+        claimed = {}
+        for ip in ips:
+            key = (ip, prop)
+            claimed[ip] = self.generations.get(key, 0) + 1
+            self.generations[key] = claimed[ip]
+            task = self.running.get(key)
+            if task is not None and not task.done():
+                logger.info(f"Cancelling superseded command for {ip}")
+                task.cancel()
+        return claimed
+
+    def is_current(self, ip: str, generation: int, prop: str = 'pilot') -> bool:
+        """Return True while no newer command has claimed the bulb."""
+        return self.generations.get((ip, prop)) == generation
+
+    def latest_wins(
+        self,
+        ips: List[str],
+        operation: Callable[[Any], Awaitable[Dict[str, Any]]],
+        prop: str = 'pilot',
+        claimed: Optional[Dict[str, int]] = None
+    ) -> Callable[[Any], Awaitable[Dict[str, Any]]]:
+        """Claim ips and wrap operation so it yields to any newer command for the same bulb.
+
+        Pass claimed to reuse generations from an earlier claim() by the same command.
+        """
+        if claimed is None:
+            claimed = self.claim(ips, prop)
+
+        async def wrapped(item: Any) -> Dict[str, Any]:
+            key = (item.ip, prop)
+            if not self.is_current(item.ip, claimed[item.ip], prop):
+                return superseded(item.ip)
+            task = asyncio.ensure_future(operation(item))
+            self.running[key] = task
+            try:
+                return await task
+            except asyncio.CancelledError:
+                # A newer claim cancelled the operation; anything else is a real cancellation
+                if not self.is_current(item.ip, claimed[item.ip], prop):
+                    return superseded(item.ip)
+                raise
+            finally:
+                if self.running.get(key) is task:
+                    del self.running[key]
+        return wrapped
+
+def superseded(ip: str) -> Dict[str, Any]:
+    """Result reported for a bulb whose command was replaced by a newer one.
+
+    The bulb neither succeeded nor failed for this command, so the result
+    carries no success flag.
+    """
+    return {
+        "ip": ip,
+        "superseded": True,
+        "message": "Superseded by a newer command"
+    }
+
+def summarize_results(results: List[Any]) -> Dict[str, Any]:
+    """Count per-light results for a response, leaving superseded bulbs out of success and failure.
+
+    Exceptions in results count as failures. success_rate is taken over the
+    bulbs this command settled, and a command whose every bulb was superseded
+    still succeeds.
+    """
+    superseded_count = sum(1 for r in results if isinstance(r, dict) and r.get("superseded", False))
+    successful = sum(1 for r in results if isinstance(r, dict) and r.get("success", False))
+    settled = len(results) - superseded_count
+    success_rate = (successful / settled) * 100 if settled else 0
+    return {
+        "overall_success": successful == settled,
+        "success_rate": f"{success_rate:.2f}%",
+        "total_processed": len(results),
+        "successful_operations": successful,
+        "failed_operations": settled - successful,
+        "superseded_operations": superseded_count
+    }
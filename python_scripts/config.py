@@ -1,8 +1,81 @@
 import os
 
+# Node passes its environment (already including .env) to every script it spawns, so
+# python-dotenv is only imported when a script is run by hand
+if 'BROADCAST_ADDRESS' not in os.environ:
+    from dotenv import load_dotenv
+    load_dotenv()
+
 # Constants for discovery and connection management
 BATCH_SIZE = 2  # Number of lights to process in each batch
 MAX_CONCURRENT_CONNECTIONS = 100  # Maximum number of concurrent connections
 CONNECTION_TIMEOUT = 5  # Timeout for each connection attempt in seconds
 RETRY_ATTEMPTS = 3  # Number of retry attempts for failed operations
-BROADCAST_ADDRESS = os.getenv('BROADCAST_ADDRESS', '192.168.18.255')
\ No newline at end of file
+BROADCAST_ADDRESS = os.getenv('BROADCAST_ADDRESS', '192.168.18.255')
+
+# Scheduling of per-light operations: 'window' keeps WINDOW_SIZE operations in flight,
+# 'batch' waits for each BATCH_SIZE chunk to finish before starting the next
+SCHEDULING_MODE = os.getenv('SCHEDULING_MODE', 'window')
+WINDOW_SIZE = int(os.getenv('WINDOW_SIZE', MAX_CONCURRENT_CONNECTIONS))
+
+# Retry policy shared by all scripts: exponential backoff with full jitter between attempts,
+# bounded by an overall per-request deadline that stays below the Node-side timeout
+RETRY_BASE_DELAY = 0.25  # Backoff before the first retry in seconds
+RETRY_MAX_DELAY = 2.0  # Upper bound for a single backoff in seconds
+REQUEST_DEADLINE = float(os.getenv('REQUEST_DEADLINE', 25))  # Time budget for a whole request in seconds
+
+# On-disk state shared between runs (bulb metadata cache and similar)
+STATE_DIR = os.getenv('LIGHTS_STATE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.state'))
+BULB_CACHE_FILE = os.path.join(STATE_DIR, 'bulb_types.json')
+BULB_CACHE_TTL = int(os.getenv('BULB_CACHE_TTL', 7 * 24 * 3600))  # Seconds before cached bulb metadata is refetched
+
+# Incremental discovery only needs a short broadcast to catch newcomers
+INCREMENTAL_BROADCAST_WAIT = float(os.getenv('INCREMENTAL_BROADCAST_WAIT', 1.0))  # Seconds to listen for broadcast replies
+
+# Send every bulb's datagrams through one shared UDP socket instead of one socket per bulb
+SHARED_UDP_ENDPOINT = os.getenv('SHARED_UDP_ENDPOINT', 'true').lower() == 'true'
+
+# Circuit breaker: after BREAKER_THRESHOLD consecutive failed operations a bulb is skipped
+# for BREAKER_COOLDOWN seconds, then probed once with a short timeout
+HEALTH_FILE = os.path.join(STATE_DIR, 'bulb_health.json')
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 3))
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', 60))
+BREAKER_PROBE_TIMEOUT = float(os.getenv('BREAKER_PROBE_TIMEOUT', 1.0))
+
+# Adaptive timeouts: per-attempt timeouts follow each bulb's smoothed RTT plus four times
+# its variance (TCP-style RTO), bounded below by RTO_MIN and above by CONNECTION_TIMEOUT
+ADAPTIVE_TIMEOUTS = os.getenv('ADAPTIVE_TIMEOUTS', 'true').lower() == 'true'
+RTO_MIN = float(os.getenv('RTO_MIN', 0.2))  # Lower bound for a learned timeout in seconds
+RTT_ALPHA = 0.125  # Gain for the smoothed RTT
+RTT_BETA = 0.25  # Gain for the RTT variance
+
+# Hedged requests: resend a packet once a bulb has not answered within its p95 RTT.
+# Each attempt earns HEDGE_BUDGET_RATIO hedge tokens (up to HEDGE_BUDGET_BURST); a hedge costs one
+HEDGING = os.getenv('HEDGING', 'true').lower() == 'true'
+HEDGE_BUDGET_RATIO = float(os.getenv('HEDGE_BUDGET_RATIO', 0.1))
+HEDGE_BUDGET_BURST = float(os.getenv('HEDGE_BUDGET_BURST', 10))
+HEDGE_MIN_SAMPLES = 5  # RTT samples needed before a bulb's p95 is trusted
+RTT_SAMPLES = 20  # Recent RTT samples kept per bulb
+
+# Last acknowledged pilot per bulb, used to skip commands that would not change anything
+PILOT_CACHE_FILE = os.path.join(STATE_DIR, 'pilots.json')
+PILOT_CACHE_TTL = int(os.getenv('PILOT_CACHE_TTL', 300))  # Seconds a cached pilot is trusted
+
+# Transitions: intermediate frames are sent at TRANSITION_FPS without acks, and no bulb
+# gets more than BULB_MAX_PPS packets per second; higher frame rates are clamped to it
+TRANSITION_FPS = float(os.getenv('TRANSITION_FPS', 10))
+TRANSITION_DURATION = 1.0  # Default fade length in seconds
+TRANSITION_READ_TIMEOUT = 1.0  # Seconds to wait for a bulb's current state when no start is given
+BULB_MAX_PPS = float(os.getenv('BULB_MAX_PPS', 10))
+TRANSITION_SEND_RESERVE = float(os.getenv('TRANSITION_SEND_RESERVE', 1.0))  # Seconds of the deadline kept for sending the end pilot
+
+# Effects rendered by effect_lights.py play through the same frame clock as transitions
+EFFECT_DURATION = 5.0  # Default effect length in seconds
+
+# Fork server: a preloaded interpreter that forks one child per request arriving from fork_shim.py
+FORK_SERVER_SOCKET = os.getenv('FORK_SERVER_SOCKET', os.path.join(STATE_DIR, 'fork_server.sock'))
+
+# Worker metrics in Prometheus text format at http://METRICS_HOST:METRICS_PORT/metrics; 0 disables them
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+METRICS_LAG_INTERVAL = float(os.getenv('METRICS_LAG_INTERVAL', 0.5))  # Seconds between event loop lag samples
\ No newline at end of file
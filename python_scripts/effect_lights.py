@@ -0,0 +1,173 @@
+import sys
+import json
+import asyncio
+import logging
+from typing import List, Dict, Any, Optional, Callable
+from config import *
+from scheduler import run_operations
+from coalescing import summarize_results
+from retry_policy import deadline_from_budget
+from result_stream import stream_result, stream_summary
+from timings import collect_timings, timed_phase
+from tracing import begin_trace, dumps_traced, epoch_ms
+from transitions import FramePlayer, playable_fps, playback_deadline, valid_fps
+from effects import EffectRenderer, EFFECTS
+import transition_lights
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class LightController(transition_lights.LightController):
+    """Play rendered effects on groups of lights.
+
+    Frames for the whole group are rendered at once by EffectRenderer and sent
+    by a FramePlayer; the frame at the end of the effect is then sent to every
+    bulb with retries so the group settles in a known state.
+    """
+
+    completed_message = "Light effect completed successfully"
+
+    async def play_effect(
+        self,
+        bulbs: List[Dict[str, Any]],
+        effect: str,
+        duration: float = EFFECT_DURATION,
+        options: Optional[Dict[str, Any]] = None,
+        fps: float = TRANSITION_FPS,
+        seed: Optional[int] = None,
+        deadline: Optional[float] = REQUEST_DEADLINE,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Play effect on bulbs (get_lights.py entries, in order) for duration seconds."""
+        if effect not in EFFECTS:
+            raise ValueError(f"Unsupported effect: {effect}")
+        if not valid_fps(fps):
+            logger.warning(f"Invalid fps: {fps!r}")
+            return {
+                "overall_success": False,
+                "message": "fps must be a number greater than 0",
+                "results": []
+            }
+        fps = playable_fps(fps)
+        options = options or {}
+        request_deadline = deadline_from_budget(deadline)
+        renderer = EffectRenderer(bulbs, seed)
+        ips = renderer.ips
+        claimed = self.coalescer.claim(ips) if self.coalescer is not None else None
+        for ip in ips:
+            self.pilot_cache.forget(ip)
+
+        def render(frame: int) -> Dict[str, Dict[str, Any]]:
+            specs = renderer.to_specs(renderer.render(effect, frame / fps, options))
+            if claimed is None:
+                return specs
+            return {ip: spec for ip, spec in specs.items() if self.coalescer.is_current(ip, claimed[ip])}
+
+        frame_count = max(0, round(duration * fps))
+        lights = {ip: await self.get_connection(ip) for ip in ips}
+        playback = await timed_phase('frames', FramePlayer(fps).play(lights, render, frame_count, playback_deadline(request_deadline)))
+
+        final = renderer.to_specs(renderer.render(effect, duration, options))
+        operations = [
+            transition_lights.LightOperation(ip=ip, pilot=final[ip], deadline=request_deadline)
+            for ip in ips
+        ]
+
+        # Each bulb settles on its own pilot, so the cache is updated per bulb
+        run_light = self.apply_pilot
+        if self.coalescer is not None:
+            run_light = self.coalescer.latest_wins(ips, run_light, claimed=claimed)
+        results = await run_operations(operations, run_light, on_result=on_result)
+        self.health.save()
+        self.pilot_cache.save()
+
+        return {
+            **summarize_results(results),
+            "effect": effect,
+            **playback,
+            "hedges_sent": sum(operation.hedges for operation in operations),
+            "results": results
+        }
+
+async def main():
+    controller = None
+    try:
+        parse_started = epoch_ms()
+        data = json.loads(sys.argv[1])
+        trace = begin_trace(data.get('trace_id'), parse_started)
+        logger.info("Parsed input parameters")
+        stream = data.get('stream', False)
+        bulbs = data.get('bulbs') or [{"ip": ip} for ip in data.get('ips', [])]
+        effect = data['effect']
+
+        if not bulbs:
+            logger.warning("No IP addresses provided")
+            response = {
+                "overall_success": False,
+                "message": "No IP addresses provided",
+                "results": []
+            }
+        else:
+            controller = LightController()
+            with collect_timings(data.get('timings', False)) as timings:
+                result = await controller.play_effect(
+                    bulbs,
+                    effect,
+                    data.get('duration', EFFECT_DURATION),
+                    data.get('options'),
+                    data.get('fps', TRANSITION_FPS),
+                    data.get('seed'),
+                    data.get('deadline', REQUEST_DEADLINE),
+                    stream_result if stream else None
+                )
+            if timings is not None:
+                result["timings"] = timings.summary()
+            response = result
+
+        if stream:
+            stream_summary(response, trace=trace)
+        else:
+            print(dumps_traced(response, trace))
+        logger.info("Response sent")
+    except json.JSONDecodeError as e:
+        logger.error(f"Error parsing JSON input: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Invalid JSON input: {str(e)}",
+            "results": []
+        }))
+    except KeyError as e:
+        logger.error(f"Missing required parameter: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Missing required parameter: {str(e)}",
+            "results": []
+        }))
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Unexpected error: {str(e)}",
+            "results": []
+        }))
+    finally:
+        if controller:
+            await controller.close_connections()
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        logger.error(f"Fatal error: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Fatal error: {str(e)}",
+            "results": []
+        }))
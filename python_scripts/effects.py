@@ -0,0 +1,111 @@
+import numpy as np
+from typing import List, Dict, Any, Optional
+
+# Defaults for bulbs described only by IP: full color and the common WiZ white range
+DEFAULT_FEATURES = {"brightness": True, "color": True, "color_tmp": True, "effect": True}
+DEFAULT_KELVIN_RANGE = {"min": 2200, "max": 6500}
+
+def hsv_to_rgb(hue: np.ndarray, saturation: float = 1.0, value: float = 1.0) -> np.ndarray:
+    """Convert an array of hues (0-1) to an (n, 3) array of RGB values (0-255)."""
+    i = np.floor(hue * 6).astype(int) % 6
+    f = hue * 6 - np.floor(hue * 6)
+    p = np.full_like(hue, value * (1 - saturation))
+    q = value * (1 - f * saturation)
+    t = value * (1 - (1 - f) * saturation)
+    v = np.full_like(hue, value)
+    # Each of the six hue sectors picks a different (r, g, b) ordering of v, t, p and q
+    r = np.choose(i, [v, q, p, p, t, v])
+    g = np.choose(i, [t, v, v, q, p, p])
+    b = np.choose(i, [p, p, t, v, v, q])
+    return np.stack([r, g, b], axis=1) * 255
+
+class EffectRenderer:
+    """Render whole-group effect frames as NumPy arrays of bulbs x channels.
+
+    Bulbs are given in order (position along the strip or room) as entries from
+    get_lights.py; every frame is clamped to each bulb's reported features and
+    kelvin range before it becomes a pilot spec.
+    """
+
+    def __init__(self, bulbs: List[Dict[str, Any]], seed: Optional[int] = None):
+        self.ips = [bulb["ip"] for bulb in bulbs]
+        features = [bulb.get("features") or DEFAULT_FEATURES for bulb in bulbs]
+        kelvin = [bulb.get("kelvin_range") or DEFAULT_KELVIN_RANGE for bulb in bulbs]
+        self.color = np.array([bool(f.get("color")) for f in features])
+        self.color_tmp = np.array([bool(f.get("color_tmp")) for f in features])
+        self.kelvin_min = np.array([k["min"] for k in kelvin], dtype=float)
+        self.kelvin_max = np.array([k["max"] for k in kelvin], dtype=float)
+        self.position = np.arange(len(bulbs)) / max(1, len(bulbs))
+        self.rng = np.random.default_rng(seed)
+
+    def rainbow(self, t: float, speed: float = 0.25, spread: float = 1.0) -> Dict[str, np.ndarray]:
+        """Hues spread along the bulb order, rotating speed turns per second."""
+        hue = (self.position * spread + t * speed) % 1.0
+        return {"rgb": hsv_to_rgb(hue)}
+
+    def gradient(
+        self,
+        t: float,
+        colors: Optional[List[List[int]]] = None,
+        kelvin: Optional[List[int]] = None,
+        speed: float = 0.0
+    ) -> Dict[str, np.ndarray]:
+        """Blend color stops (or kelvin stops) along the bulb order, optionally scrolling."""
+        position = (self.position + t * speed) % 1.0
+        if kelvin is not None:
+            stops = np.linspace(0, 1, len(kelvin))
+            return {"kelvin": np.interp(position, stops, kelvin)}
+        colors = np.array(colors or [[255, 0, 0], [0, 0, 255]], dtype=float)
+        stops = np.linspace(0, 1, len(colors))
+        rgb = np.stack([np.interp(position, stops, colors[:, channel]) for channel in range(3)], axis=1)
+        return {"rgb": rgb}
+
+    def twinkle(
+        self,
+        t: float,
+        color: Optional[List[int]] = None,
+        depth: float = 0.7
+    ) -> Dict[str, np.ndarray]:
+        """A fixed color whose brightness flickers randomly per bulb."""
+        rgb = np.tile(np.array(color or [255, 180, 80], dtype=float), (len(self.ips), 1))
+        brightness = 255 * (1 - depth * self.rng.random(len(self.ips)))
+        return {"rgb": rgb, "brightness": brightness}
+
+    def render(self, effect: str, t: float, options: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Render one frame of the named effect at time t seconds."""
+        if effect not in EFFECTS:
+            raise ValueError(f"Unsupported effect: {effect}")
+        return getattr(self, effect)(t, **options)
+
+    def to_specs(self, frame: Dict[str, np.ndarray]) -> Dict[str, Dict[str, Any]]:
+        """Clamp a rendered frame to each bulb's capabilities and build pilot specs by IP.
+
+        RGB on white-only bulbs becomes a color temperature from the red/blue
+        balance; kelvin is clipped to each bulb's range; brightness-only bulbs
+        just get the frame's brightness.
+        """
+        n = len(self.ips)
+        brightness = frame.get("brightness")
+        if "rgb" in frame:
+            rgb = np.clip(np.rint(frame["rgb"]), 0, 255).astype(int)
+            coolness = rgb[:, 2] / np.maximum(1, rgb[:, 0] + rgb[:, 2])
+            kelvin = self.kelvin_min + coolness * (self.kelvin_max - self.kelvin_min)
+            if brightness is None:
+                brightness = rgb.max(axis=1)
+        else:
+            rgb = None
+            kelvin = np.clip(frame["kelvin"], self.kelvin_min, self.kelvin_max)
+        kelvin = np.rint(kelvin).astype(int)
+        brightness = np.clip(np.rint(brightness if brightness is not None else np.full(n, 255)), 0, 255).astype(int)
+
+        specs = {}
+        for index, ip in enumerate(self.ips):
+            spec: Dict[str, Any] = {"brightness": int(brightness[index])}
+            if rgb is not None and self.color[index]:
+                spec["rgb"] = rgb[index].tolist()
+            elif self.color_tmp[index]:
+                spec["colortemp"] = int(kelvin[index])
+            specs[ip] = spec
+        return specs
+
+EFFECTS = ['rainbow', 'gradient', 'twinkle']
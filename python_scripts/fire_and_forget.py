@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from pywizlight import wizlight
+from pywizlight.utils import to_wiz_json
+from typing import List, Dict, Any, Optional, Callable
+from dataclasses import dataclass
+from config import *
+from scheduler import run_operations
+from coalescing import summarize_results
+from retry_policy import RetryPolicy, deadline_from_budget
+from state_diff import StateDiff, unchanged_result
+
+logger = logging.getLogger(__name__)
+
+GET_PILOT_MESSAGE = {"method": "getPilot", "params": {}}
+
+@dataclass
+class Verification:
+    ip: str
+    retries: int = 0
+    deadline: Optional[float] = None
+    hedges: int = 0
+
+async def send_without_ack(light: wizlight, message: Dict[str, Any]) -> None:
+    """Put one command on the wire without waiting for the bulb's acknowledgement."""
+    await light._ensure_connection()
+    light.transport.sendto(to_wiz_json(message).encode(), (light.ip, light.port))
+
+def pilot_applied(expected: Dict[str, Any], reported: Dict[str, Any]) -> bool:
+    """Check that the bulb reports back every parameter that was sent, with the sent value.
+
+    A parameter the bulb does not report (temp while it shows RGB, say) is not
+    confirmed, so the change counts as not applied.
+    """
+    return all(key in reported and reported[key] == value for key, value in expected.items())
+
+async def send_pilot_no_wait(
+    controller: Any,
+    ips: List[str],
+    message: Dict[str, Any],
+    verify: bool = False,
+    deadline: Optional[float] = REQUEST_DEADLINE,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    diff: Optional[StateDiff] = None
+) -> Dict[str, Any]:
+    """Send the same pilot message to every light without waiting for acks.
+
+    controller supplies get_connection and the shared semaphore. With verify,
+    a single getPilot sweep (one attempt per bulb, no retries) reports which
+    bulbs actually applied the change. Bulbs that diff reports as unchanged
+    are skipped.
+    """
+    async def send(ip: str) -> Dict[str, Any]:
+        if diff is not None:
+            if diff.unchanged(ip):
+                return unchanged_result(ip)
+            diff.sending(ip)
+        try:
+            light = await controller.get_connection(ip)
+            await send_without_ack(light, message)
+            return {
+                "success": True,
+                "ip": ip,
+                "message": "Command sent without waiting for acknowledgement"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "ip": ip,
+                "message": str(e)
+            }
+
+    # Sending never waits on the network, so every packet goes out before the sweep starts
+    results = await asyncio.gather(*(send(ip) for ip in ips))
+    if verify:
+        sent = [result["ip"] for result in results if result["success"] and not result.get("unchanged")]
+        verified = await verify_pilot(controller, sent, message, deadline)
+        results = [verified.get(result["ip"], result) for result in results]
+        if diff is not None:
+            for result in verified.values():
+                if result["applied"]:
+                    diff.applied(result["ip"])
+
+    if on_result is not None:
+        for result in results:
+            on_result(result)
+
+    return {
+        **summarize_results(results),
+        "no_wait": True,
+        "verified": verify,
+        "results": results
+    }
+
+async def verify_pilot(
+    controller: Any,
+    ips: List[str],
+    message: Dict[str, Any],
+    deadline: Optional[float] = REQUEST_DEADLINE
+) -> Dict[str, Dict[str, Any]]:
+    """Read back every light once and report whether it applied message, keyed by IP."""
+    policy = RetryPolicy(attempts=0, health=getattr(controller, 'health', None), breaker=False)
+    request_deadline = deadline_from_budget(deadline)
+    expected = message["params"]
+
+    async def check(verification: Verification) -> Dict[str, Any]:
+        try:
+            light = await controller.get_connection(verification.ip)
+            state = await policy.run(
+                controller.semaphore,
+                verification,
+                light.updateState,
+                lambda: send_without_ack(light, GET_PILOT_MESSAGE)
+            )
+            applied = state is not None and pilot_applied(expected, state.pilotResult)
+            return {
+                "success": applied,
+                "ip": verification.ip,
+                "applied": applied,
+                "message": "Change confirmed" if applied else "Light reports a different state"
+            }
+        except asyncio.TimeoutError:
+            return {
+                "success": False,
+                "ip": verification.ip,
+                "applied": False,
+                "message": "No response to verification"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "ip": verification.ip,
+                "applied": False,
+                "message": str(e)
+            }
+
+    verifications = [Verification(ip=ip, deadline=request_deadline) for ip in ips]
+    results = await run_operations(verifications, check)
+    return {result["ip"]: result for result in results}
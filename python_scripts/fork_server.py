@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import runpy
+import random
+import signal
+import socket
+import logging
+import importlib
+from typing import Dict, Any, List, Optional, Tuple
+from config import *
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# One-shot scripts the server can run; each is imported once, before the first fork
+SCRIPTS = [
+    'get_lights',
+    'turn_on_lights',
+    'turn_off_lights',
+    'set_lights_color',
+    'set_lights_warm_white',
+    'set_lights_cold_white',
+    'set_lights_pilot',
+    'set_lights_bulk',
+    'transition_lights',
+    'effect_lights'
+]
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Largest request line accepted from a shim (the JSON argument of a bulk request can be large)
+MAX_REQUEST_BYTES = 4 * 1024 * 1024
+
+class ForkServer:
+    """Serve per-script requests from children forked off one preloaded interpreter.
+
+    fork_shim.py sends the script name, argv and environment over a Unix socket,
+    passing its own stdout and stderr along. The server forks; the child takes over those
+    descriptors and runs the script's __main__ block exactly as `python script.py`
+    would, so callers see the same argv/stdout JSON contract. Imports, including
+    pywizlight, happen once here instead of in every request.
+    """
+
+    def __init__(self, path: str = FORK_SERVER_SOCKET):
+        self.path = path
+        self.listener = None
+
+    def preload(self) -> None:
+        """Import every script module so children start with warm module caches."""
+        for script in SCRIPTS:
+            importlib.import_module(script)
+        logger.info(f"Preloaded {len(SCRIPTS)} scripts")
+
+    def listen(self) -> None:
+        """Bind the Unix socket, replacing a stale one from an earlier run."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        self.listener.listen(128)
+        logger.info(f"Fork server listening on {self.path}")
+
+    def read_request(self, conn: socket.socket) -> Tuple[Dict[str, Any], List[int]]:
+        """Read one JSON request line and the stdout/stderr descriptors sent with it."""
+        data, fds, _, _ = socket.recv_fds(conn, 65536, 2)
+        while not data.endswith(b"\n"):
+            chunk = conn.recv(65536)
+            if not chunk or len(data) > MAX_REQUEST_BYTES:
+                raise ValueError("Incomplete request")
+            data += chunk
+        return json.loads(data), fds
+
+    def apply_env(self, env: Optional[Dict[str, str]]) -> None:
+        """Give the child the shim's environment.
+
+        config.py and the defaults taken from it are read at import time, so when
+        the environment differs from the server's, the preloaded script modules
+        are dropped and run_module imports them again under the new one.
+        Third-party modules such as pywizlight stay loaded.
+        """
+        if env is None or env == dict(os.environ):
+            return
+        os.environ.clear()
+        os.environ.update(env)
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, '__file__', None)
+            if name != '__main__' and path and os.path.dirname(os.path.abspath(path)) == SCRIPTS_DIR:
+                del sys.modules[name]
+
+    def run_child(self, conn: socket.socket, request: Dict[str, Any], fds: List[int]) -> None:
+        """Run one script in a forked child with the shim's stdout and stderr, then exit."""
+        exit_code = 1
+        try:
+            self.listener.close()
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            # Every child would otherwise share the parent's retry jitter sequence
+            random.seed()
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(fds[0], 1)
+            os.dup2(fds[1], 2)
+            for fd in [devnull, *fds]:
+                os.close(fd)
+            conn.sendall(json.dumps({"pid": os.getpid()}).encode() + b"\n")
+
+            self.apply_env(request.get('env'))
+            script = request['script']
+            sys.argv = [os.path.join(SCRIPTS_DIR, f'{script}.py'), *request.get('argv', [])]
+            try:
+                runpy.run_module(script, run_name='__main__', alter_sys=True)
+                exit_code = 0
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception as e:
+            logger.error(f"Error running {request.get('script')}: {str(e)}")
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                conn.sendall(json.dumps({"exit": exit_code}).encode() + b"\n")
+            except Exception:
+                pass
+            os._exit(exit_code)
+
+    def handle(self, conn: socket.socket) -> None:
+        """Fork a child for one request; the parent only keeps accepting."""
+        fds: List[int] = []
+        try:
+            request, fds = self.read_request(conn)
+            if request.get('script') not in SCRIPTS or len(fds) != 2:
+                conn.sendall(json.dumps({"error": f"Unsupported script: {request.get('script')}"}).encode() + b"\n")
+                return
+            if os.fork() == 0:
+                self.run_child(conn, request, fds)
+        except Exception as e:
+            logger.error(f"Error handling request: {str(e)}")
+        finally:
+            for fd in fds:
+                os.close(fd)
+            conn.close()
+
+    def serve(self) -> None:
+        """Accept requests until terminated."""
+        # Children are never waited on; let the kernel reap them
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        while True:
+            conn, _ = self.listener.accept()
+            self.handle(conn)
+
+    def close(self) -> None:
+        if self.listener is not None:
+            self.listener.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+def main():
+    server = ForkServer()
+    # Leave through the finally block so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.preload()
+        server.listen()
+        server.serve()
+    except KeyboardInterrupt:
+        logger.info("Fork server stopped")
+    finally:
+        server.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import json
+import signal
+import socket
+
+# Kept tiny on purpose: this runs once per request, so it must not import asyncio,
+# pywizlight or config. Mirrors FORK_SERVER_SOCKET in config.py.
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_DIR = os.getenv('LIGHTS_STATE_DIR', os.path.join(SCRIPTS_DIR, '.state'))
+FORK_SERVER_SOCKET = os.getenv('FORK_SERVER_SOCKET', os.path.join(STATE_DIR, 'fork_server.sock'))
+
+def run_directly(script: str, args: list) -> None:
+    """Run the script in this process's place when the fork server is unavailable."""
+    script_path = os.path.join(SCRIPTS_DIR, f'{script}.py')
+    if sys.platform == 'win32':
+        import subprocess
+        sys.exit(subprocess.run([sys.executable, script_path, *args]).returncode)
+    os.execv(sys.executable, [sys.executable, script_path, *args])
+
+def run_forked(script: str, args: list) -> int | None:
+    """Ask the fork server to run the script with this process's stdout, stderr and environment.
+
+    Returns the script's exit code, or None when the server cannot take the request.
+    """
+    try:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(FORK_SERVER_SOCKET)
+    except OSError:
+        return None
+
+    sys.stdout.flush()
+    request = json.dumps({"script": script, "argv": args, "env": dict(os.environ)}).encode() + b"\n"
+    socket.send_fds(conn, [request], [sys.stdout.fileno(), sys.stderr.fileno()])
+    reader = conn.makefile('r')
+
+    first = reader.readline()
+    if not first:
+        return None
+    reply = json.loads(first)
+    if 'pid' not in reply:
+        return None
+
+    # The Node side kills this process on timeout; pass that on to the child doing the work
+    def forward(signum, frame):
+        try:
+            os.kill(reply['pid'], signum)
+        finally:
+            sys.exit(128 + signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    last = reader.readline()
+    return json.loads(last).get('exit', 1) if last else 1
+
+def main():
+    # Usage: python fork_shim.py <script> [json argument]
+    script, args = sys.argv[1], sys.argv[2:]
+    exit_code = run_forked(script, args) if hasattr(socket, 'AF_UNIX') else None
+    if exit_code is None:
+        run_directly(script, args)
+    sys.exit(exit_code)
+
+if __name__ == '__main__':
+    main()
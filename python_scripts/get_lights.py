@@ -3,14 +3,19 @@ import json
 import asyncio
 import logging
 from pywizlight import wizlight, PilotBuilder, discovery
-from typing import List, Dict, Any
+from pywizlight.bulb import PilotParser
+from typing import List, Dict, Any, Optional, Union, Callable
 from dataclasses import dataclass
-from concurrent.futures import ThreadPoolExecutor
-from dotenv import load_dotenv
 from config import *
-
-# Load environment variables
-load_dotenv()
+from scheduler import run_operations
+from udp_endpoint import create_light
+from retry_policy import RetryPolicy, deadline_from_budget
+from bulb_health import HealthBoard
+from fire_and_forget import send_without_ack, GET_PILOT_MESSAGE
+from bulb_cache import BulbTypeCache, describe_bulb_type
+from result_stream import stream_result, stream_summary
+from timings import collect_timings, timed_phase
+from tracing import begin_trace, dumps_traced, epoch_ms
 
 # Configure logging
 logging.basicConfig(
@@ -19,21 +24,47 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def describe_state(state: PilotParser) -> Dict[str, Any]:
+    """Build the state part of a bulb description from a pilot response."""
+    r, g, b = state.get_rgb()
+    return {
+        "colorTemp": state.get_colortemp(),
+        "rgb": [r, g, b],
+        "scene": state.get_scene(),
+        "isOn": state.get_state(),
+        "brightness": state.get_brightness(),
+        "warmWhite": state.get_warm_white(),
+        "coldWhite": state.get_cold_white(),
+    }
+
 @dataclass
 class BulbInfo:
     ip: str
+    mac: Optional[str] = None
     retries: int = 0
+    deadline: Optional[float] = None
+    hedges: int = 0
 
 class LightDiscovery:
-    def __init__(self):
-        self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_CONNECTIONS)
-        self.connection_pool: Dict[str, wizlight] = {}
-        self.executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CONNECTIONS)
+    def __init__(
+        self,
+        connection_pool: Optional[Dict[str, wizlight]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        health: Optional[HealthBoard] = None,
+        broadcast_address: str = BROADCAST_ADDRESS
+    ):
+        self.semaphore = semaphore or asyncio.Semaphore(MAX_CONCURRENT_CONNECTIONS)
+        self.broadcast_address = broadcast_address
+        self.connection_pool: Dict[str, wizlight] = connection_pool if connection_pool is not None else {}
+        self.health = health if health is not None else HealthBoard()
+        # Discovery reaches bulbs whatever their breaker says; health only tunes timeouts and hedging
+        self.retry_policy = RetryPolicy(health=self.health, breaker=False)
+        self.bulb_cache = BulbTypeCache()
 
     async def get_connection(self, ip: str) -> wizlight:
         """Get or create a connection to a light."""
         if ip not in self.connection_pool:
-            self.connection_pool[ip] = wizlight(ip)
+            self.connection_pool[ip] = create_light(ip)
         return self.connection_pool[ip]
 
     async def close_connections(self):
@@ -51,65 +82,63 @@ class LightDiscovery:
 
     async def get_bulb_info(self, bulb_info: BulbInfo) -> Dict[str, Any]:
         """Get detailed information about a single bulb with retry logic."""
-        async with self.semaphore:
-            try:
-                light = await self.get_connection(bulb_info.ip)
-                state = await asyncio.wait_for(light.updateState(), timeout=CONNECTION_TIMEOUT)
-                bulb_type = await asyncio.wait_for(light.get_bulbtype(), timeout=CONNECTION_TIMEOUT)
-                
-                r, g, b = state.get_rgb()
-                
-                return {
-                    "ip": bulb_info.ip,
-                    "state": {
-                        "colorTemp": state.get_colortemp(),
-                        "rgb": [r, g, b],
-                        "scene": state.get_scene(),
-                        "isOn": state.get_state(),
-                        "brightness": state.get_brightness(),
-                        "warmWhite": state.get_warm_white(),
-                        "coldWhite": state.get_cold_white(),
-                    },
-                    "features": {
-                        "brightness": bulb_type.features.brightness,
-                        "color": bulb_type.features.color,
-                        "color_tmp": bulb_type.features.color_tmp,
-                        "effect": bulb_type.features.effect
-                    },
-                    "kelvin_range": {
-                        "max": bulb_type.kelvin_range.max,
-                        "min": bulb_type.kelvin_range.min
-                    },
-                    "name": bulb_type.name,
-                    "success": True
-                }
-            except asyncio.TimeoutError:
-                if bulb_info.retries < RETRY_ATTEMPTS:
-                    bulb_info.retries += 1
-                    logger.warning(f"Timeout for {bulb_info.ip}, retry {bulb_info.retries}")
-                    return await self.get_bulb_info(bulb_info)
-                return {
-                    "ip": bulb_info.ip,
-                    "success": False,
-                    "error": f"Operation timed out after {RETRY_ATTEMPTS} attempts"
-                }
-            except Exception as e:
-                return {
-                    "ip": bulb_info.ip,
-                    "success": False,
-                    "error": str(e)
-                }
+        try:
+            light = await self.get_connection(bulb_info.ip)
+            state = await self.retry_policy.run(
+                self.semaphore,
+                bulb_info,
+                light.updateState,
+                lambda: send_without_ack(light, GET_PILOT_MESSAGE)
+            )
+            # A bulb that answers discovery is alive, so close its breaker for the control scripts
+            self.health.record_success(bulb_info.ip)
+            # Inventories without MACs still hit the cache: getPilot reports the bulb's MAC
+            bulb_info.mac = bulb_info.mac or state.get_mac()
+
+            # Model, features and kelvin range never change, so only new bulbs need get_bulbtype()
+            static_info = self.bulb_cache.get(bulb_info.mac)
+            if static_info is None:
+                bulb_type = await self.retry_policy.run(self.semaphore, bulb_info, light.get_bulbtype)
+                static_info = self.bulb_cache.put(bulb_info.mac, describe_bulb_type(bulb_type))
+            
+            return {
+                "ip": bulb_info.ip,
+                "mac": bulb_info.mac,
+                "state": describe_state(state),
+                **static_info,
+                "success": True
+            }
+        except asyncio.TimeoutError:
+            return {
+                "ip": bulb_info.ip,
+                "success": False,
+                "error": f"Operation timed out after {bulb_info.retries + 1} attempts"
+            }
+        except Exception as e:
+            return {
+                "ip": bulb_info.ip,
+                "success": False,
+                "error": str(e)
+            }
 
-    async def process_batch(self, bulbs: List[BulbInfo]) -> List[Dict[str, Any]]:
-        """Process a batch of bulb information requests."""
-        tasks = [self.get_bulb_info(bulb) for bulb in bulbs]
-        return await asyncio.gather(*tasks, return_exceptions=True)
+    async def discover_lights(
+        self,
+        deadline: Optional[float] = REQUEST_DEADLINE,
+        invalidate_cache: Union[bool, List[str]] = False,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Discover and get information about all lights on the network.
 
-    async def discover_lights(self) -> Dict[str, Any]:
-        """Discover and get information about all lights on the network."""
+        invalidate_cache drops cached bulb metadata first: True clears every
+        entry, a list of MAC addresses clears only those bulbs. on_result is
+        called with each bulb's entry as soon as it is known.
+        """
         try:
-            logger.info(f"Starting light discovery on network using broadcast address: {BROADCAST_ADDRESS}")
-            discovered_bulbs = await discovery.discover_lights(broadcast_space=BROADCAST_ADDRESS)
+            if invalidate_cache:
+                self.bulb_cache.invalidate(None if invalidate_cache is True else invalidate_cache)
+            request_deadline = deadline_from_budget(deadline)
+            logger.info(f"Starting light discovery on network using broadcast address: {self.broadcast_address}")
+            discovered_bulbs = await timed_phase('broadcast', discovery.discover_lights(broadcast_space=self.broadcast_address))
             
             if not discovered_bulbs:
                 logger.info("No lights discovered on the network")
@@ -120,15 +149,10 @@ class LightDiscovery:
                     "message": "No lights found on the network"
                 }
 
-            bulb_infos = [BulbInfo(ip=bulb.ip) for bulb in discovered_bulbs]
-            results = []
-
-            # Process in batches
-            for i in range(0, len(bulb_infos), BATCH_SIZE):
-                batch = bulb_infos[i:i + BATCH_SIZE]
-                logger.info(f"Processing batch {i//BATCH_SIZE + 1} of {(len(bulb_infos)-1)//BATCH_SIZE + 1}")
-                batch_results = await self.process_batch(batch)
-                results.extend(batch_results)
+            bulb_infos = [BulbInfo(ip=bulb.ip, mac=bulb.mac, deadline=request_deadline) for bulb in discovered_bulbs]
+            results = await run_operations(bulb_infos, self.get_bulb_info, on_result=on_result)
+            self.bulb_cache.save()
+            self.health.save()
 
             # Filter out exceptions and failed operations
             valid_results = [r for r in results if isinstance(r, dict)]
@@ -154,13 +178,133 @@ class LightDiscovery:
                 "message": f"Error during discovery: {error_message}"
             }
 
+    async def discover_changes(
+        self,
+        known: List[Dict[str, Any]],
+        deadline: Optional[float] = REQUEST_DEADLINE,
+        broadcast_wait: float = INCREMENTAL_BROADCAST_WAIT
+    ) -> Dict[str, Any]:
+        """Refresh a previously discovered inventory and report only what changed.
+
+        Known bulbs get a single state query each (their metadata comes from the
+        inventory or the bulb type cache) while a short broadcast picks up
+        newcomers and bulbs that moved to a different IP.
+        """
+        try:
+            request_deadline = deadline_from_budget(deadline)
+            for bulb in known:
+                if bulb.get("mac") and self.bulb_cache.get(bulb["mac"]) is None and "features" in bulb:
+                    self.bulb_cache.put(bulb["mac"], {
+                        "features": bulb["features"],
+                        "kelvin_range": bulb["kelvin_range"],
+                        "name": bulb["name"]
+                    })
+
+            logger.info(f"Refreshing {len(known)} known light(s) using broadcast address: {self.broadcast_address}")
+            known_infos = [BulbInfo(ip=bulb["ip"], mac=bulb.get("mac"), deadline=request_deadline) for bulb in known]
+            broadcast_results, known_results = await asyncio.gather(
+                timed_phase('broadcast', discovery.find_wizlights(wait_time=broadcast_wait, broadcast_address=self.broadcast_address)),
+                run_operations(known_infos, self.get_bulb_info)
+            )
+            seen_ips_by_mac = {bulb.mac_address: bulb.ip_address for bulb in broadcast_results}
+            seen_ips = {bulb.ip_address for bulb in broadcast_results}
+
+            changed = []
+            removed = []
+            unchanged = 0
+            moved_infos = []
+            for bulb, result in zip(known, known_results):
+                if isinstance(result, dict) and result.get("success", False):
+                    if result["state"] != bulb.get("state"):
+                        changed.append(result)
+                    else:
+                        unchanged += 1
+                    continue
+
+                if bulb.get("mac"):
+                    seen_ip = seen_ips_by_mac.get(bulb["mac"])
+                else:
+                    # Without a MAC a bulb can only be matched by IP, so a moved one shows up as removed and added
+                    seen_ip = bulb["ip"] if bulb["ip"] in seen_ips else None
+                if seen_ip is None:
+                    removed.append({"ip": bulb["ip"], "mac": bulb.get("mac")})
+                elif seen_ip != bulb["ip"]:
+                    moved_infos.append(BulbInfo(ip=seen_ip, mac=bulb["mac"], deadline=request_deadline))
+                else:
+                    # Answered the broadcast but not the state query; keep the last known state
+                    unchanged += 1
+
+            known_macs = {bulb.get("mac") for bulb in known}
+            known_ips = {bulb["ip"] for bulb in known}
+            new_infos = [
+                BulbInfo(ip=found.ip_address, mac=found.mac_address, deadline=request_deadline)
+                for found in broadcast_results
+                if found.mac_address not in known_macs and found.ip_address not in known_ips
+            ]
+            new_results = await run_operations(moved_infos + new_infos, self.get_bulb_info)
+            self.bulb_cache.save()
+            self.health.save()
+
+            moved_results = new_results[:len(moved_infos)]
+            added_results = new_results[len(moved_infos):]
+            for info, result in zip(moved_infos, moved_results):
+                if isinstance(result, dict) and result.get("success", False):
+                    changed.append(result)
+                else:
+                    removed.append({"ip": info.ip, "mac": info.mac})
+            added = [r for r in added_results if isinstance(r, dict) and r.get("success", False)]
+
+            return {
+                "success": True,
+                "incremental": True,
+                "count": len(known) - len(removed) + len(added),
+                "added": added,
+                "removed": removed,
+                "changed": changed,
+                "unchanged": unchanged,
+                "message": f"{len(added)} added, {len(removed)} removed, {len(changed)} changed"
+            }
+        except Exception as e:
+            error_message = str(e)
+            logger.error(f"Error during incremental discovery: {error_message}")
+            return {
+                "success": False,
+                "incremental": True,
+                "count": 0,
+                "added": [],
+                "removed": [],
+                "changed": [],
+                "unchanged": 0,
+                "message": f"Error during discovery: {error_message}"
+            }
+
 async def main():
     discovery_controller = None
     try:
+        parse_started = epoch_ms()
+        data = json.loads(sys.argv[1]) if len(sys.argv) > 1 else {}
+        trace = begin_trace(data.get('trace_id'), parse_started)
         logger.info("Starting light discovery process")
+        stream = data.get('stream', False)
         discovery_controller = LightDiscovery()
-        result = await discovery_controller.discover_lights()
-        print(json.dumps(result))
+        with collect_timings(data.get('timings', False)) as timings:
+            if data.get('known') is not None:
+                result = await discovery_controller.discover_changes(
+                    data['known'],
+                    data.get('deadline', REQUEST_DEADLINE)
+                )
+            else:
+                result = await discovery_controller.discover_lights(
+                    data.get('deadline', REQUEST_DEADLINE),
+                    data.get('invalidate_cache', False),
+                    stream_result if stream else None
+                )
+        if timings is not None:
+            result["timings"] = timings.summary()
+        if stream:
+            stream_summary(result, trace=trace)
+        else:
+            print(dumps_traced(result, trace))
         logger.info("Discovery process completed")
     except Exception as e:
         logger.error(f"Unexpected error during discovery: {str(e)}")
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from typing import Any, Callable, Awaitable
+from config import *
+
+logger = logging.getLogger(__name__)
+
+class HedgeBudget:
+    """Token bucket that caps hedged packets at a fraction of regular attempts.
+
+    Every attempt earns ``ratio`` tokens up to ``burst``; a hedge spends one
+    token. A burst of loss therefore cannot turn into a packet storm.
+    """
+
+    def __init__(self, ratio: float = HEDGE_BUDGET_RATIO, burst: float = HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self.sent = 0
+
+    def deposit(self) -> None:
+        """Credit the budget for one regular attempt."""
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Spend a token on a hedge, returning False when the budget is exhausted."""
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        self.sent += 1
+        return True
+
+# Shared by every controller in the process
+hedge_budget = HedgeBudget()
+
+async def hedged(
+    call: Callable[[], Awaitable[Any]],
+    hedge: Callable[[], Awaitable[None]],
+    delay: float,
+    operation: Any
+) -> Any:
+    """Await call, sending one duplicate packet if no reply arrived within delay.
+
+    The duplicate is answered with the same method, so whichever reply arrives
+    first completes call. Counts the hedge on ``operation.hedges``.
+    """
+    task = asyncio.ensure_future(call())
+    try:
+        done, _ = await asyncio.wait({task}, timeout=delay)
+        if not done and hedge_budget.withdraw():
+            logger.info(f"No reply from {operation.ip} after {delay * 1000:.0f}ms, sending hedge")
+            operation.hedges += 1
+            await hedge()
+        return await task
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,33 @@
+import os
+import json
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+def load_json(path: str, default: Any) -> Any:
+    """Load JSON from path, returning default when the file is missing or unreadable."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable state file {path}: {str(e)}")
+        return default
+
+def save_json(path: str, data: Any) -> None:
+    """Atomically write data as JSON to path so concurrent readers never see a partial file."""
+    # Imported here because most runs only read state; tempfile pulls in shutil and random
+    import tempfile
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,282 @@
+import sys
+import time
+import json
+import asyncio
+import logging
+from pywizlight import wizlight
+from typing import Dict, Any, Optional, Callable
+from config import *
+import get_lights
+import set_lights_color
+import set_lights_bulk
+import set_lights_pilot
+import set_lights_cold_white
+import set_lights_warm_white
+import turn_off_lights
+import turn_on_lights
+import transition_lights
+import state_tracker
+from bulb_health import HealthBoard
+from coalescing import Coalescer
+from state_diff import PilotCache
+from result_stream import stream_result, build_summary, write_line
+from timings import collect_timings
+from metrics import WorkerMetrics
+from tracing import current_trace, begin_trace, epoch_ms
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SUPPORTED_COMMANDS = ['turn_on', 'turn_off', 'color', 'warm_white', 'cold_white', 'pilot', 'bulk', 'transition', 'effect', 'discover', 'track', 'state']
+
+class LightWorker:
+    """Long-lived worker that serves newline-delimited JSON commands.
+
+    Every controller shares one semaphore, one connection pool and one health
+    scoreboard, so bulbs contacted by an earlier command are reused by later ones.
+    Light commands also share a Coalescer: a newer command for a bulb replaces
+    a queued one and cancels one still in flight (latest wins). With
+    METRICS_PORT set, the worker's metrics are served for Prometheus to scrape.
+    """
+
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_CONNECTIONS)
+        self.connection_pool: Dict[str, wizlight] = {}
+        self.health = HealthBoard()
+        self.coalescer = Coalescer()
+        self.pilot_cache = PilotCache()
+        shared = {"connection_pool": self.connection_pool, "semaphore": self.semaphore}
+        controls = {
+            **shared,
+            "health": self.health,
+            "coalescer": self.coalescer,
+            "pilot_cache": self.pilot_cache
+        }
+        self.turn_on = turn_on_lights.LightController(**controls)
+        self.turn_off = turn_off_lights.LightController(**controls)
+        self.color = set_lights_color.LightController(**controls)
+        self.warm_white = set_lights_warm_white.LightController(**controls)
+        self.cold_white = set_lights_cold_white.LightController(**controls)
+        self.pilot = set_lights_pilot.LightController(**controls)
+        self.bulk = set_lights_bulk.LightController(**controls)
+        self.transition = transition_lights.LightController(**controls)
+        # The effect controller needs NumPy, so it is only built for the first effect command
+        self.effect = None
+        self.controls = controls
+        self.discovery = get_lights.LightDiscovery(**shared, health=self.health)
+        self.tracker = state_tracker.StateTracker(**shared, health=self.health)
+        self.pending = set()
+        self.metrics = WorkerMetrics({
+            "lights_connection_pool_size": ("Open bulb connections in the shared pool.", lambda: len(self.connection_pool)),
+            "lights_commands_in_flight": ("Commands received and not yet answered.", lambda: len(self.pending))
+        })
+
+    async def execute(
+        self,
+        command: str,
+        params: Dict[str, Any],
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Run a single command against the shared controllers."""
+        if command == 'discover':
+            if params.get('known') is not None:
+                return await self.discovery.discover_changes(
+                    params['known'],
+                    params.get('deadline', REQUEST_DEADLINE)
+                )
+            return await self.discovery.discover_lights(
+                params.get('deadline', REQUEST_DEADLINE),
+                params.get('invalidate_cache', False),
+                on_result
+            )
+
+        if command == 'state':
+            return self.tracker.snapshot()
+        if command == 'track':
+            bulbs = params.get('bulbs') or [{"ip": ip} for ip in params['ips']]
+            return await self.tracker.track(bulbs, params.get('deadline', REQUEST_DEADLINE))
+        if command == 'effect':
+            if self.effect is None:
+                import effect_lights
+                self.effect = effect_lights.LightController(**self.controls)
+            bulbs = params.get('bulbs') or [{"ip": ip} for ip in params['ips']]
+            return await self.effect.play_effect(
+                bulbs,
+                params['effect'],
+                params.get('duration', EFFECT_DURATION),
+                params.get('options'),
+                params.get('fps', TRANSITION_FPS),
+                params.get('seed'),
+                params.get('deadline', REQUEST_DEADLINE),
+                on_result
+            )
+
+        if command == 'bulk':
+            if not params['items']:
+                logger.warning("No items provided")
+                return {
+                    "overall_success": False,
+                    "message": "No items provided",
+                    "results": []
+                }
+            return await self.bulk.set_lights_bulk(
+                params['items'],
+                params.get('deadline', REQUEST_DEADLINE),
+                on_result,
+                params.get('known_state'),
+                params.get('skip_unchanged', False)
+            )
+
+        ips = params['ips']
+        if not ips:
+            logger.warning("No IP addresses provided")
+            return {
+                "overall_success": False,
+                "message": "No IP addresses provided",
+                "results": []
+            }
+
+        deadline = params.get('deadline', REQUEST_DEADLINE)
+        no_wait = params.get('no_wait', False)
+        verify = params.get('verify', False)
+        known_state = params.get('known_state')
+        skip_unchanged = params.get('skip_unchanged', False)
+        if command == 'turn_on':
+            return await self.turn_on.turn_on_lights(ips, deadline, on_result, no_wait, verify, known_state, skip_unchanged)
+        if command == 'turn_off':
+            return await self.turn_off.turn_off_lights(ips, deadline, on_result, no_wait, verify, known_state, skip_unchanged)
+        if command == 'color':
+            return await self.color.set_lights_color(ips, tuple(params['color']), deadline, on_result, no_wait, verify, known_state, skip_unchanged)
+        if command == 'warm_white':
+            return await self.warm_white.set_lights_warm_white(ips, params['intensity'], deadline, on_result, no_wait, verify, known_state, skip_unchanged)
+        if command == 'cold_white':
+            return await self.cold_white.set_lights_cold_white(ips, params['intensity'], deadline, on_result, no_wait, verify, known_state, skip_unchanged)
+        if command == 'pilot':
+            return await self.pilot.set_lights_pilot(ips, params['pilot'], deadline, on_result, no_wait, verify, known_state, skip_unchanged)
+        if command == 'transition':
+            return await self.transition.transition_lights(
+                ips,
+                params['end'],
+                params.get('duration', TRANSITION_DURATION),
+                params.get('start'),
+                params.get('fps', TRANSITION_FPS),
+                deadline,
+                on_result
+            )
+        raise ValueError(f"Unsupported command: {command}")
+
+    async def handle_line(self, line: str) -> Dict[str, Any]:
+        """Parse one request line and build its response."""
+        started = time.perf_counter()
+        request_id = None
+        command = 'invalid'
+        outcome = 'error'
+        timings = None
+        try:
+            parse_started = epoch_ms()
+            request = json.loads(line)
+            begin_trace(request.get('params', {}).get('trace_id'), parse_started)
+            request_id = request.get('id')
+            command = request['command']
+            if command not in SUPPORTED_COMMANDS:
+                command = 'unsupported'
+                response = {
+                    "overall_success": False,
+                    "message": f"Unsupported command: {request['command']}",
+                    "results": []
+                }
+            else:
+                params = request.get('params', {})
+                stream = params.get('stream', False)
+                tags = {"id": request_id}
+                # Always collected, for the metrics; only returned when asked for
+                with collect_timings() as timings:
+                    response = await self.execute(command, params, (lambda result: stream_result(result, tags)) if stream else None)
+                outcome = 'success' if response.get('overall_success', response.get('success')) else 'failure'
+                if params.get('timings', False):
+                    response["timings"] = timings.summary()
+                if stream:
+                    response = build_summary(response)
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parsing JSON input: {str(e)}")
+            response = {
+                "overall_success": False,
+                "message": f"Invalid JSON input: {str(e)}",
+                "results": []
+            }
+        except KeyError as e:
+            logger.error(f"Missing required parameter: {str(e)}")
+            response = {
+                "overall_success": False,
+                "message": f"Missing required parameter: {str(e)}",
+                "results": []
+            }
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}")
+            response = {
+                "overall_success": False,
+                "message": f"Unexpected error: {str(e)}",
+                "results": []
+            }
+        self.metrics.record_command(command, outcome, time.perf_counter() - started, timings)
+        return {"id": request_id, **response}
+
+    async def serve_request(self, line: str):
+        """Handle one request and write its response line."""
+        response = await self.handle_line(line)
+        # handle_line ran in this task, so its trace (if any) is still current here
+        write_line(response, current_trace.get())
+
+    async def serve(self):
+        """Read commands from stdin until EOF, running them concurrently."""
+        loop = asyncio.get_running_loop()
+        metrics_server = await self.metrics.serve() if METRICS_PORT else None
+        logger.info("Light worker ready")
+        try:
+            while True:
+                line = await loop.run_in_executor(None, sys.stdin.readline)
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self.serve_request(line))
+                self.pending.add(task)
+                task.add_done_callback(self.pending.discard)
+
+            if self.pending:
+                await asyncio.gather(*self.pending, return_exceptions=True)
+            logger.info("Stdin closed, shutting down light worker")
+        finally:
+            if metrics_server is not None:
+                self.metrics.close()
+                metrics_server.close()
+
+    async def close_connections(self):
+        """Close the shared connection pool."""
+        await self.turn_on.close_connections()
+
+async def main():
+    worker = None
+    try:
+        worker = LightWorker()
+        await worker.serve()
+    finally:
+        if worker:
+            await worker.close_connections()
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        logger.error(f"Fatal error: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Fatal error: {str(e)}",
+            "results": []
+        }))
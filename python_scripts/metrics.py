@@ -0,0 +1,179 @@
+import asyncio
+import logging
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from config import *
+from hedging import hedge_budget
+from timings import RequestTimings
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds
+RTT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COMMAND_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+def escape_label(value: Any) -> str:
+    """Escape a label value for the text exposition format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels: Dict[str, Any]) -> str:
+    """Render a label set as {name="value",...}, or nothing when empty."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + "}"
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: Dict[str, str]) -> List[str]:
+        lines = [
+            f"{name}_bucket{format_labels({**labels, 'le': str(bound)})} {count}"
+            for bound, count in zip(self.buckets, self.counts)
+        ]
+        lines.append(f"{name}_bucket{format_labels({**labels, 'le': '+Inf'})} {self.count}")
+        lines.append(f"{name}_sum{format_labels(labels)} {self.sum:.6f}")
+        lines.append(f"{name}_count{format_labels(labels)} {self.count}")
+        return lines
+
+class WorkerMetrics:
+    """Counters, histograms and gauges of a light_worker.py process.
+
+    Every command is recorded once it completes, together with the
+    RequestTimings collected while it ran. Gauges are read at scrape time
+    through the callables passed in. The text exposition format is served over
+    plain HTTP by serve(), so Prometheus (or curl) can scrape /metrics.
+    """
+
+    def __init__(self, gauges: Optional[Dict[str, Tuple[str, Callable[[], float]]]] = None):
+        self.gauges = gauges or {}
+        self.commands: Dict[Tuple[str, str], int] = {}
+        self.command_durations: Dict[str, Histogram] = {}
+        self.bulb_rtts: Dict[str, Histogram] = {}
+        self.semaphore_wait = Histogram(RTT_BUCKETS)
+        self.loop_lag = Histogram(LAG_BUCKETS)
+        self.attempts = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.lag_task: Optional[asyncio.Task] = None
+
+    def record_command(
+        self,
+        command: str,
+        outcome: str,
+        duration: float,
+        timings: Optional[RequestTimings] = None
+    ) -> None:
+        """Count a finished command and fold in the timings recorded while it ran."""
+        key = (command, outcome)
+        self.commands[key] = self.commands.get(key, 0) + 1
+        self.command_durations.setdefault(command, Histogram(COMMAND_BUCKETS)).observe(duration)
+        if timings is None:
+            return
+        for ip, rtt in timings.rtts:
+            self.bulb_rtts.setdefault(ip, Histogram(RTT_BUCKETS)).observe(rtt)
+        for wait in timings.queue_waits:
+            self.semaphore_wait.observe(wait)
+        self.attempts += len(timings.queue_waits)
+        self.retries += timings.retries
+        self.timeouts += timings.timeouts
+
+    async def watch_loop_lag(self, interval: float = METRICS_LAG_INTERVAL) -> None:
+        """Sample how late the event loop wakes up from a sleep, until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag.observe(max(0.0, loop.time() - started - interval))
+
+    def render(self) -> str:
+        """Build the Prometheus text exposition of every metric."""
+        lines = [
+            "# HELP lights_commands_total Worker commands by command and outcome.",
+            "# TYPE lights_commands_total counter"
+        ]
+        for (command, outcome), count in sorted(self.commands.items()):
+            lines.append(f"lights_commands_total{format_labels({'command': command, 'outcome': outcome})} {count}")
+
+        lines += [
+            "# HELP lights_command_duration_seconds Time from a command's arrival to its response.",
+            "# TYPE lights_command_duration_seconds histogram"
+        ]
+        for command, histogram in sorted(self.command_durations.items()):
+            lines += histogram.lines("lights_command_duration_seconds", {"command": command})
+
+        lines += [
+            "# HELP lights_bulb_rtt_seconds Round-trip time of acknowledged attempts per bulb.",
+            "# TYPE lights_bulb_rtt_seconds histogram"
+        ]
+        for ip, histogram in sorted(self.bulb_rtts.items()):
+            lines += histogram.lines("lights_bulb_rtt_seconds", {"ip": ip})
+
+        lines += [
+            "# HELP lights_semaphore_wait_seconds Time attempts waited for a connection slot.",
+            "# TYPE lights_semaphore_wait_seconds histogram",
+            *self.semaphore_wait.lines("lights_semaphore_wait_seconds", {}),
+            "# HELP lights_event_loop_lag_seconds How late the event loop woke up from a timed sleep.",
+            "# TYPE lights_event_loop_lag_seconds histogram",
+            *self.loop_lag.lines("lights_event_loop_lag_seconds", {})
+        ]
+
+        counters = [
+            ("lights_attempts_total", "Attempts sent to bulbs, including retries.", self.attempts),
+            ("lights_retries_total", "Retries after a timed-out attempt.", self.retries),
+            ("lights_timeouts_total", "Attempts that timed out.", self.timeouts),
+            ("lights_hedges_total", "Hedged duplicate packets sent.", hedge_budget.sent)
+        ]
+        for name, help_text, value in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {value}"]
+
+        for name, (help_text, read) in self.gauges.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {read()}"]
+        return "\n".join(lines) + "\n"
+
+    async def handle_scrape(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer one HTTP request: the metrics on GET /metrics, 404 otherwise."""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.split()
+            if len(parts) >= 2 and parts[0] == b"GET" and parts[1].split(b"?")[0] == b"/metrics":
+                status, body = "200 OK", self.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.warning(f"Error serving metrics: {str(e)}")
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = METRICS_HOST, port: int = METRICS_PORT) -> asyncio.AbstractServer:
+        """Start serving /metrics over HTTP and sampling event loop lag."""
+        server = await asyncio.start_server(self.handle_scrape, host, port)
+        self.lag_task = asyncio.create_task(self.watch_loop_lag())
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+        return server
+
+    def close(self) -> None:
+        """Stop sampling event loop lag."""
+        if self.lag_task is not None:
+            self.lag_task.cancel()
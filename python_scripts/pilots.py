@@ -0,0 +1,39 @@
+from pywizlight import PilotBuilder
+from pywizlight.bulb import PilotParser
+from typing import Dict, Any
+
+# Keys of a pilot spec, the plain-JSON form of a PilotBuilder used by scripts that
+# accept arbitrary pilots: state, rgb, warm_white, cold_white, brightness (0-255)
+# and colortemp (kelvin)
+SPEC_KEYS = ('state', 'rgb', 'warm_white', 'cold_white', 'brightness', 'colortemp')
+
+def build_pilot(spec: Dict[str, Any]) -> PilotBuilder:
+    """Build a PilotBuilder from a pilot spec."""
+    rgb = spec.get('rgb')
+    return PilotBuilder(
+        state=spec.get('state', True),
+        rgb=tuple(rgb) if rgb is not None else None,
+        warm_white=spec.get('warm_white'),
+        cold_white=spec.get('cold_white'),
+        brightness=spec.get('brightness'),
+        colortemp=spec.get('colortemp')
+    )
+
+def pilot_message(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the setPilot message for a spec; an 'off' spec only carries the state."""
+    if not spec.get('state', True):
+        return {"method": "setPilot", "params": {"state": False}}
+    return build_pilot(spec).set_pilot_message()
+
+def spec_from_state(state: PilotParser) -> Dict[str, Any]:
+    """Convert a bulb's reported pilot back into a spec, leaving out unreported values."""
+    r, g, b = state.get_rgb()
+    spec = {
+        "state": bool(state.get_state()),
+        "rgb": [r, g, b] if r is not None else None,
+        "warm_white": state.get_warm_white(),
+        "cold_white": state.get_cold_white(),
+        "brightness": state.get_brightness(),
+        "colortemp": state.get_colortemp()
+    }
+    return {key: value for key, value in spec.items() if value is not None}
@@ -0,0 +1,27 @@
+import sys
+from typing import Dict, Any, Optional
+from tracing import Trace, dumps_traced
+
+def write_line(payload: Dict[str, Any], trace: Optional[Trace] = None) -> None:
+    """Write one JSON line to stdout and flush so the caller sees it immediately."""
+    sys.stdout.write(dumps_traced(payload, trace) + "\n")
+    sys.stdout.flush()
+
+def stream_result(result: Any, tags: Optional[Dict[str, Any]] = None) -> None:
+    """Emit a single per-light result line."""
+    if isinstance(result, Exception):
+        result = {"success": False, "message": str(result)}
+    write_line({**(tags or {}), "type": "result", **result})
+
+def build_summary(response: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop the per-light entries from a response, since they were already streamed."""
+    summary = {key: value for key, value in response.items() if key not in ("results", "bulbs")}
+    return {"type": "summary", **summary}
+
+def stream_summary(
+    response: Dict[str, Any],
+    tags: Optional[Dict[str, Any]] = None,
+    trace: Optional[Trace] = None
+) -> None:
+    """Emit the closing summary line, carrying the request's trace when it has one."""
+    write_line({**(tags or {}), **build_summary(response)}, trace)
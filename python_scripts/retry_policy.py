@@ -0,0 +1,166 @@
+import random
+import asyncio
+import logging
+from typing import Any, Callable, Awaitable, Optional
+from config import *
+from bulb_health import HealthBoard, BulbUnhealthyError, OPEN, HALF_OPEN
+from hedging import hedge_budget, hedged
+from timings import current_timings
+from tracing import current_trace, epoch_ms, traced_phase
+
+logger = logging.getLogger(__name__)
+
+def deadline_from_budget(budget: Optional[float]) -> Optional[float]:
+    """Convert a time budget in seconds into an absolute event loop deadline."""
+    if budget is None:
+        return None
+    return asyncio.get_running_loop().time() + float(budget)
+
+class RetryPolicy:
+    """Retry timed-out light operations with exponential backoff and jitter.
+
+    The semaphore is only held while an attempt is on the wire, so a bulb that
+    is backing off does not keep a connection slot from other bulbs. Operations
+    are any objects with ``ip``, ``retries`` and ``deadline`` attributes.
+
+    With a HealthBoard, bulbs whose breaker is open are skipped without touching
+    the network and half-open bulbs get one short probe instead of full retries.
+    Attempt timeouts then follow each bulb's learned RTO, doubling per retry,
+    and callers that pass a hedge get one duplicate packet per attempt once the
+    bulb's p95 RTT has passed without a reply. Reads that must reach bulbs
+    whatever their breaker says (discovery, tracking, verification) pass
+    breaker=False: the HealthBoard then only supplies timeouts and hedge delays.
+
+    When the request collects timings, every attempt's semaphore wait, RTT or
+    timeout and every retry is recorded into its RequestTimings. A traced
+    request gets send (waiting for a slot until the packet goes out), ack and
+    retry (backoff) spans.
+    """
+
+    def __init__(
+        self,
+        attempts: int = RETRY_ATTEMPTS,
+        attempt_timeout: float = CONNECTION_TIMEOUT,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+        health: Optional[HealthBoard] = None,
+        breaker: bool = True
+    ):
+        self.attempts = attempts
+        self.attempt_timeout = attempt_timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.health = health
+        self.breaker = breaker and health is not None
+
+    def backoff_delay(self, retry: int) -> float:
+        """Return the full-jitter backoff before the given retry."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+    def timeout_for(self, ip: str, attempt: int) -> float:
+        """Return the timeout for an attempt, learned from the bulb's RTT when available."""
+        rto = self.health.rto(ip) if self.health is not None else None
+        if rto is None:
+            return self.attempt_timeout
+        return min(self.attempt_timeout, rto * (2 ** attempt))
+
+    def hedge_delay_for(self, ip: str, hedge: Optional[Callable[[], Awaitable[None]]]) -> Optional[float]:
+        """Return how long to wait before hedging an attempt, or None to not hedge."""
+        if hedge is None or self.health is None or not HEDGING:
+            return None
+        return self.health.hedge_delay(ip)
+
+    def remaining(self, operation: Any) -> Optional[float]:
+        """Return the seconds left before the operation's deadline, if it has one."""
+        if operation.deadline is None:
+            return None
+        return operation.deadline - asyncio.get_running_loop().time()
+
+    async def run(
+        self,
+        semaphore: asyncio.Semaphore,
+        operation: Any,
+        call: Callable[[], Awaitable[Any]],
+        hedge: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> Any:
+        """Run call until it succeeds, retries run out or the deadline passes.
+
+        hedge, when given, resends call's packet without waiting for a reply; the
+        operation then needs a ``hedges`` counter.
+
+        Raises asyncio.TimeoutError when the operation could not complete in time
+        and BulbUnhealthyError when the bulb's breaker is open (unless the
+        policy ignores breakers).
+        """
+        probe = False
+        if self.breaker:
+            breaker = self.health.state(operation.ip)
+            if breaker == OPEN:
+                raise BulbUnhealthyError(operation.ip)
+            probe = breaker == HALF_OPEN
+
+        loop = asyncio.get_running_loop()
+        timings = current_timings.get()
+        trace = current_trace.get()
+        attempted = False
+        attempt = 0
+        try:
+            while True:
+                queued = loop.time()
+                queued_ms = epoch_ms() if trace is not None else None
+                async with semaphore:
+                    remaining = self.remaining(operation)
+                    if remaining is not None and remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    timeout = self.timeout_for(operation.ip, attempt)
+                    if remaining is not None:
+                        timeout = min(timeout, remaining)
+                    if probe:
+                        timeout = min(timeout, BREAKER_PROBE_TIMEOUT)
+                    if timings is not None:
+                        timings.record_queue_wait(loop.time() - queued)
+                    attempted = True
+                    attempt_call = call
+                    hedge_delay = self.hedge_delay_for(operation.ip, hedge)
+                    if hedge_delay is not None and hedge_delay < timeout:
+                        attempt_call = lambda: hedged(call, hedge, hedge_delay, operation)
+                    hedge_budget.deposit()
+                    if trace is not None:
+                        sent_ms = epoch_ms()
+                        trace.record('send', queued_ms, sent_ms)
+                    try:
+                        started = loop.time()
+                        result = await asyncio.wait_for(attempt_call(), timeout=timeout)
+                        if timings is not None:
+                            timings.record_rtt(operation.ip, loop.time() - started)
+                        if self.health is not None:
+                            self.health.record_success(operation.ip, loop.time() - started, sample=attempt == 0)
+                        return result
+                    except asyncio.TimeoutError:
+                        if timings is not None:
+                            timings.record_timeout()
+                        if self.health is not None:
+                            self.health.record_timeout(operation.ip)
+                        if probe or operation.retries >= self.attempts:
+                            raise
+                    finally:
+                        if trace is not None:
+                            trace.record('ack', sent_ms, epoch_ms())
+
+                delay = self.backoff_delay(operation.retries)
+                remaining = self.remaining(operation)
+                if remaining is not None and remaining <= delay:
+                    logger.warning(f"Deadline reached for {operation.ip}, giving up after {operation.retries + 1} attempts")
+                    raise asyncio.TimeoutError()
+                operation.retries += 1
+                attempt += 1
+                if timings is not None:
+                    timings.record_retry()
+                logger.warning(f"Timeout for {operation.ip}, retry {operation.retries} in {delay:.2f}s")
+                with traced_phase('retry'):
+                    await asyncio.sleep(delay)
+        except Exception:
+            # Only count bulbs that were actually tried, not ones the deadline cut off first
+            if self.breaker and attempted:
+                self.health.record_failure(operation.ip)
+            raise
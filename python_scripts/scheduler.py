@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import List, Any, Callable, Awaitable, Sequence, Optional
+from config import *
+
+logger = logging.getLogger(__name__)
+
+async def run_batched(
+    items: Sequence[Any],
+    operation: Callable[[Any], Awaitable[Any]],
+    batch_size: int = BATCH_SIZE
+) -> List[Any]:
+    """Run operations in lock-step batches, waiting for each batch to finish."""
+    results = []
+    for i in range(0, len(items), batch_size):
+        batch = items[i:i + batch_size]
+        logger.info(f"Processing batch {i//batch_size + 1} of {(len(items)-1)//batch_size + 1}")
+        batch_results = await asyncio.gather(*(operation(item) for item in batch), return_exceptions=True)
+        results.extend(batch_results)
+    return results
+
+async def run_windowed(
+    items: Sequence[Any],
+    operation: Callable[[Any], Awaitable[Any]],
+    window_size: int = WINDOW_SIZE
+) -> List[Any]:
+    """Run operations with up to window_size in flight, starting the next as soon as a slot frees.
+
+    Results are returned in the order of items; exceptions are returned in place
+    of results, matching asyncio.gather(..., return_exceptions=True).
+    """
+    results: List[Any] = [None] * len(items)
+    pending = iter(enumerate(items))
+
+    async def slot():
+        # Every slot pulls from the same iterator, so a slow item only holds up its own slot
+        for index, item in pending:
+            try:
+                results[index] = await operation(item)
+            except Exception as e:
+                results[index] = e
+
+    slots = min(window_size, len(items))
+    logger.info(f"Processing {len(items)} operation(s) with {slots} in flight")
+    await asyncio.gather(*(slot() for _ in range(slots)))
+    return results
+
+def reporting(
+    operation: Callable[[Any], Awaitable[Any]],
+    on_result: Callable[[Any], None]
+) -> Callable[[Any], Awaitable[Any]]:
+    """Wrap operation so on_result sees each result (or exception) as soon as it completes."""
+    async def wrapped(item: Any) -> Any:
+        try:
+            result = await operation(item)
+        except Exception as e:
+            on_result(e)
+            raise
+        on_result(result)
+        return result
+    return wrapped
+
+async def run_operations(
+    items: Sequence[Any],
+    operation: Callable[[Any], Awaitable[Any]],
+    mode: str = SCHEDULING_MODE,
+    on_result: Optional[Callable[[Any], None]] = None
+) -> List[Any]:
+    """Run operations using the configured scheduling mode.
+
+    on_result, when given, is called with every result in completion order.
+    """
+    if on_result is not None:
+        operation = reporting(operation, on_result)
+    if mode == 'batch':
+        return await run_batched(items, operation)
+    return await run_windowed(items, operation)
@@ -0,0 +1,223 @@
+import sys
+import json
+import asyncio
+import logging
+from pywizlight import wizlight
+from typing import List, Dict, Any, Optional, Callable
+from dataclasses import dataclass
+from config import *
+from scheduler import run_operations
+from udp_endpoint import create_light
+from retry_policy import RetryPolicy, deadline_from_budget
+from bulb_health import HealthBoard
+from result_stream import stream_result, stream_summary
+from timings import collect_timings
+from tracing import begin_trace, dumps_traced, epoch_ms
+from coalescing import Coalescer, summarize_results
+from state_diff import PilotCache, StateDiff
+from fire_and_forget import send_without_ack
+from pilots import SPEC_KEYS, pilot_message
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+@dataclass
+class LightOperation:
+    ip: str
+    pilot: Dict[str, Any]
+    retries: int = 0
+    deadline: Optional[float] = None
+    hedges: int = 0
+
+class LightController:
+    """Send a different pilot spec to every light over one connection pool."""
+
+    completed_message = "Light pilot set successfully"
+
+    def __init__(
+        self,
+        connection_pool: Optional[Dict[str, wizlight]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        health: Optional[HealthBoard] = None,
+        coalescer: Optional[Coalescer] = None,
+        pilot_cache: Optional[PilotCache] = None
+    ):
+        self.semaphore = semaphore or asyncio.Semaphore(MAX_CONCURRENT_CONNECTIONS)
+        self.connection_pool: Dict[str, wizlight] = connection_pool if connection_pool is not None else {}
+        self.health = health if health is not None else HealthBoard()
+        self.retry_policy = RetryPolicy(health=self.health)
+        self.coalescer = coalescer
+        self.pilot_cache = pilot_cache if pilot_cache is not None else PilotCache()
+
+    async def get_connection(self, ip: str) -> wizlight:
+        """Get or create a connection to a light."""
+        if ip not in self.connection_pool:
+            self.connection_pool[ip] = create_light(ip)
+        return self.connection_pool[ip]
+
+    async def close_connections(self):
+        """Close all connections in the pool."""
+        close_tasks = []
+        for ip, light in self.connection_pool.items():
+            try:
+                close_tasks.append(light.async_close())
+            except Exception as e:
+                logger.error(f"Error closing connection to {ip}: {str(e)}")
+
+        if close_tasks:
+            await asyncio.gather(*close_tasks, return_exceptions=True)
+        self.connection_pool.clear()
+
+    async def set_light_pilot(self, operation: LightOperation) -> Dict[str, Any]:
+        """Send one light its pilot with retry logic."""
+        try:
+            light = await self.get_connection(operation.ip)
+            message = pilot_message(operation.pilot)
+            await self.retry_policy.run(
+                self.semaphore,
+                operation,
+                lambda: light.send(message),
+                lambda: send_without_ack(light, message)
+            )
+            return {
+                "success": True,
+                "ip": operation.ip,
+                "message": self.completed_message
+            }
+        except asyncio.TimeoutError:
+            return {
+                "success": False,
+                "ip": operation.ip,
+                "message": f"Operation timed out after {operation.retries + 1} attempts"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "ip": operation.ip,
+                "message": str(e)
+            }
+
+    async def apply_pilot(
+        self,
+        operation: LightOperation,
+        known_state: Optional[Dict[str, Dict[str, Any]]] = None,
+        skip_unchanged: bool = False
+    ) -> Dict[str, Any]:
+        """Send a light its pilot unless it already matches, keeping the pilot cache current."""
+        try:
+            params = pilot_message(operation.pilot)["params"]
+        except ValueError as e:
+            return {
+                "success": False,
+                "ip": operation.ip,
+                "message": str(e)
+            }
+        diff = StateDiff(self.pilot_cache, params, known_state, skip_unchanged)
+        return await diff.wrap(self.set_light_pilot)(operation)
+
+    async def set_lights_bulk(
+        self,
+        items: List[Dict[str, Any]],
+        deadline: Optional[float] = REQUEST_DEADLINE,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+        known_state: Optional[Dict[str, Dict[str, Any]]] = None,
+        skip_unchanged: bool = False
+    ) -> Dict[str, Any]:
+        """Set each light to its own pilot; a later item for the same IP replaces an earlier one."""
+        request_deadline = deadline_from_budget(deadline)
+        pilots = {item['ip']: {key: item[key] for key in SPEC_KEYS if key in item} for item in items}
+        operations = [LightOperation(ip=ip, pilot=pilot, deadline=request_deadline) for ip, pilot in pilots.items()]
+
+        async def run_light(operation: LightOperation) -> Dict[str, Any]:
+            return await self.apply_pilot(operation, known_state, skip_unchanged)
+
+        if self.coalescer is not None:
+            run_light = self.coalescer.latest_wins(list(pilots), run_light)
+        results = await run_operations(operations, run_light, on_result=on_result)
+        self.health.save()
+        self.pilot_cache.save()
+
+        return {
+            **summarize_results(results),
+            "hedges_sent": sum(operation.hedges for operation in operations),
+            "results": results
+        }
+
+async def main():
+    controller = None
+    try:
+        parse_started = epoch_ms()
+        data = json.loads(sys.argv[1])
+        trace = begin_trace(data.get('trace_id'), parse_started)
+        logger.info("Parsed input parameters")
+        stream = data.get('stream', False)
+        items = data['items']
+
+        if not items:
+            logger.warning("No items provided")
+            response = {
+                "overall_success": False,
+                "message": "No items provided",
+                "results": []
+            }
+        else:
+            controller = LightController()
+            with collect_timings(data.get('timings', False)) as timings:
+                result = await controller.set_lights_bulk(
+                    items,
+                    data.get('deadline', REQUEST_DEADLINE),
+                    stream_result if stream else None,
+                    data.get('known_state'),
+                    data.get('skip_unchanged', False)
+                )
+            if timings is not None:
+                result["timings"] = timings.summary()
+            response = result
+
+        if stream:
+            stream_summary(response, trace=trace)
+        else:
+            print(dumps_traced(response, trace))
+        logger.info("Response sent")
+    except json.JSONDecodeError as e:
+        logger.error(f"Error parsing JSON input: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Invalid JSON input: {str(e)}",
+            "results": []
+        }))
+    except KeyError as e:
+        logger.error(f"Missing required parameter: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Missing required parameter: {str(e)}",
+            "results": []
+        }))
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Unexpected error: {str(e)}",
+            "results": []
+        }))
+    finally:
+        if controller:
+            await controller.close_connections()
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        logger.error(f"Fatal error: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Fatal error: {str(e)}",
+            "results": []
+        }))
@@ -3,10 +3,19 @@ import json
 import asyncio
 import logging
 from pywizlight import wizlight, PilotBuilder
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable
 from dataclasses import dataclass
-from concurrent.futures import ThreadPoolExecutor
 from config import *
+from scheduler import run_operations
+from udp_endpoint import create_light
+from retry_policy import RetryPolicy, deadline_from_budget
+from bulb_health import HealthBoard
+from result_stream import stream_result, stream_summary
+from timings import collect_timings
+from tracing import begin_trace, dumps_traced, epoch_ms
+from coalescing import Coalescer, summarize_results
+from state_diff import PilotCache, StateDiff
+from fire_and_forget import send_pilot_no_wait, send_without_ack
 
 # Configure logging
 logging.basicConfig(
@@ -20,17 +29,29 @@ class LightOperation:
     ip: str
     intensity: int
     retries: int = 0
+    deadline: Optional[float] = None
+    hedges: int = 0
 
 class LightController:
-    def __init__(self):
-        self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_CONNECTIONS)
-        self.connection_pool: Dict[str, wizlight] = {}
-        self.executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CONNECTIONS)
+    def __init__(
+        self,
+        connection_pool: Optional[Dict[str, wizlight]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        health: Optional[HealthBoard] = None,
+        coalescer: Optional[Coalescer] = None,
+        pilot_cache: Optional[PilotCache] = None
+    ):
+        self.semaphore = semaphore or asyncio.Semaphore(MAX_CONCURRENT_CONNECTIONS)
+        self.connection_pool: Dict[str, wizlight] = connection_pool if connection_pool is not None else {}
+        self.health = health if health is not None else HealthBoard()
+        self.retry_policy = RetryPolicy(health=self.health)
+        self.coalescer = coalescer
+        self.pilot_cache = pilot_cache if pilot_cache is not None else PilotCache()
 
     async def get_connection(self, ip: str) -> wizlight:
         """Get or create a connection to a light."""
         if ip not in self.connection_pool:
-            self.connection_pool[ip] = wizlight(ip)
+            self.connection_pool[ip] = create_light(ip)
         return self.connection_pool[ip]
 
     async def close_connections(self):
@@ -48,70 +69,77 @@ class LightController:
 
     async def set_light_cold_white(self, operation: LightOperation) -> Dict[str, Any]:
         """Set cold white for a single light with retry logic."""
-        async with self.semaphore:
-            try:
-                light = await self.get_connection(operation.ip)
-                await asyncio.wait_for(
-                    light.turn_on(PilotBuilder(cold_white=operation.intensity)),
-                    timeout=CONNECTION_TIMEOUT
-                )
-                return {
-                    "success": True,
-                    "ip": operation.ip,
-                    "message": f"Light set to cold white with intensity {operation.intensity} successfully"
-                }
-            except asyncio.TimeoutError:
-                if operation.retries < RETRY_ATTEMPTS:
-                    operation.retries += 1
-                    logger.warning(f"Timeout for {operation.ip}, retry {operation.retries}")
-                    return await self.set_light_cold_white(operation)
-                return {
-                    "success": False,
-                    "ip": operation.ip,
-                    "message": f"Operation timed out after {RETRY_ATTEMPTS} attempts"
-                }
-            except Exception as e:
-                return {
-                    "success": False,
-                    "ip": operation.ip,
-                    "message": str(e)
-                }
-
-    async def process_batch(self, operations: List[LightOperation]) -> List[Dict[str, Any]]:
-        """Process a batch of light operations."""
-        tasks = [self.set_light_cold_white(op) for op in operations]
-        return await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            light = await self.get_connection(operation.ip)
+            pilot = PilotBuilder(cold_white=operation.intensity)
+            await self.retry_policy.run(
+                self.semaphore,
+                operation,
+                lambda: light.turn_on(pilot),
+                lambda: send_without_ack(light, pilot.set_pilot_message())
+            )
+            return {
+                "success": True,
+                "ip": operation.ip,
+                "message": f"Light set to cold white with intensity {operation.intensity} successfully"
+            }
+        except asyncio.TimeoutError:
+            return {
+                "success": False,
+                "ip": operation.ip,
+                "message": f"Operation timed out after {operation.retries + 1} attempts"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "ip": operation.ip,
+                "message": str(e)
+            }
 
-    async def set_lights_cold_white(self, ips: List[str], intensity: int) -> Dict[str, Any]:
-        """Set cold white for multiple lights with batching."""
-        operations = [LightOperation(ip=ip, intensity=intensity) for ip in ips]
-        results = []
-        
-        # Process in batches
-        for i in range(0, len(operations), BATCH_SIZE):
-            batch = operations[i:i + BATCH_SIZE]
-            logger.info(f"Processing batch {i//BATCH_SIZE + 1} of {(len(operations)-1)//BATCH_SIZE + 1}")
-            batch_results = await self.process_batch(batch)
-            results.extend(batch_results)
+    async def set_lights_cold_white(
+        self,
+        ips: List[str],
+        intensity: int,
+        deadline: Optional[float] = REQUEST_DEADLINE,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+        no_wait: bool = False,
+        verify: bool = False,
+        known_state: Optional[Dict[str, Dict[str, Any]]] = None,
+        skip_unchanged: bool = False
+    ) -> Dict[str, Any]:
+        """Set cold white for multiple lights."""
+        message = PilotBuilder(cold_white=intensity).set_pilot_message()
+        diff = StateDiff(self.pilot_cache, message["params"], known_state, skip_unchanged)
+        if no_wait:
+            if self.coalescer is not None:
+                self.coalescer.claim(ips)
+            response = await send_pilot_no_wait(self, ips, message, verify, deadline, on_result, diff)
+            self.pilot_cache.save()
+            return response
 
-        # Calculate success rate
-        successful = sum(1 for r in results if isinstance(r, dict) and r.get("success", False))
-        success_rate = (successful / len(results)) * 100 if results else 0
+        request_deadline = deadline_from_budget(deadline)
+        operations = [LightOperation(ip=ip, intensity=intensity, deadline=request_deadline) for ip in ips]
+        run_light = diff.wrap(self.set_light_cold_white)
+        if self.coalescer is not None:
+            run_light = self.coalescer.latest_wins(ips, run_light)
+        results = await run_operations(operations, run_light, on_result=on_result)
+        self.health.save()
+        self.pilot_cache.save()
 
         return {
-            "overall_success": successful == len(results),
-            "success_rate": f"{success_rate:.2f}%",
-            "total_processed": len(results),
-            "successful_operations": successful,
-            "failed_operations": len(results) - successful,
+            **summarize_results(results),
+            "hedges_sent": sum(operation.hedges for operation in operations),
             "results": results
         }
 
 async def main():
     controller = None
     try:
-        logger.info("Parsing input parameters")
+        parse_started = epoch_ms()
         data = json.loads(sys.argv[1])
+        trace = begin_trace(data.get('trace_id'), parse_started)
+        logger.info("Parsed input parameters")
+        stream = data.get('stream', False)
         ips = data['ips']
         intensity = data['intensity']
         
@@ -124,10 +152,25 @@ async def main():
             }
         else:
             controller = LightController()
-            result = await controller.set_lights_cold_white(ips, intensity)
+            with collect_timings(data.get('timings', False)) as timings:
+                result = await controller.set_lights_cold_white(
+                    ips,
+                    intensity,
+                    data.get('deadline', REQUEST_DEADLINE),
+                    stream_result if stream else None,
+                    data.get('no_wait', False),
+                    data.get('verify', False),
+                    data.get('known_state'),
+                    data.get('skip_unchanged', False)
+                )
+            if timings is not None:
+                result["timings"] = timings.summary()
             response = result
         
-        print(json.dumps(response))
+        if stream:
+            stream_summary(response, trace=trace)
+        else:
+            print(dumps_traced(response, trace))
         logger.info("Response sent")
     except json.JSONDecodeError as e:
         logger.error(f"Error parsing JSON input: {str(e)}")
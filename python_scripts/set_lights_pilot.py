@@ -0,0 +1,154 @@
+import sys
+import json
+import asyncio
+import logging
+from typing import List, Dict, Any, Optional, Callable
+from config import *
+from scheduler import run_operations
+from coalescing import summarize_results
+from retry_policy import deadline_from_budget
+from result_stream import stream_result, stream_summary
+from timings import collect_timings
+from tracing import begin_trace, dumps_traced, epoch_ms
+from state_diff import StateDiff
+from fire_and_forget import send_pilot_no_wait
+from pilots import SPEC_KEYS, pilot_message
+import set_lights_bulk
+from set_lights_bulk import LightOperation
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class LightController(set_lights_bulk.LightController):
+    """Send one combined pilot (state, brightness, color temperature and/or RGB) to every light.
+
+    All attributes travel in a single setPilot datagram per bulb, so a scene
+    change is one round-trip instead of one per attribute.
+    """
+
+    async def set_lights_pilot(
+        self,
+        ips: List[str],
+        pilot: Dict[str, Any],
+        deadline: Optional[float] = REQUEST_DEADLINE,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+        no_wait: bool = False,
+        verify: bool = False,
+        known_state: Optional[Dict[str, Dict[str, Any]]] = None,
+        skip_unchanged: bool = False
+    ) -> Dict[str, Any]:
+        """Set multiple lights to the same combined pilot."""
+        pilot = {key: pilot[key] for key in SPEC_KEYS if key in pilot}
+        message = pilot_message(pilot)
+        diff = StateDiff(self.pilot_cache, message["params"], known_state, skip_unchanged)
+        if no_wait:
+            if self.coalescer is not None:
+                self.coalescer.claim(ips)
+            response = await send_pilot_no_wait(self, ips, message, verify, deadline, on_result, diff)
+            self.pilot_cache.save()
+            return response
+
+        request_deadline = deadline_from_budget(deadline)
+        operations = [LightOperation(ip=ip, pilot=pilot, deadline=request_deadline) for ip in ips]
+        run_light = diff.wrap(self.set_light_pilot)
+        if self.coalescer is not None:
+            run_light = self.coalescer.latest_wins(ips, run_light)
+        results = await run_operations(operations, run_light, on_result=on_result)
+        self.health.save()
+        self.pilot_cache.save()
+
+        return {
+            **summarize_results(results),
+            "hedges_sent": sum(operation.hedges for operation in operations),
+            "results": results
+        }
+
+async def main():
+    controller = None
+    try:
+        parse_started = epoch_ms()
+        data = json.loads(sys.argv[1])
+        trace = begin_trace(data.get('trace_id'), parse_started)
+        logger.info("Parsed input parameters")
+        stream = data.get('stream', False)
+        ips = data.get('ips', [])
+        pilot = data['pilot']
+
+        if not ips:
+            logger.warning("No IP addresses provided")
+            response = {
+                "overall_success": False,
+                "message": "No IP addresses provided",
+                "results": []
+            }
+        else:
+            controller = LightController()
+            with collect_timings(data.get('timings', False)) as timings:
+                result = await controller.set_lights_pilot(
+                    ips,
+                    pilot,
+                    data.get('deadline', REQUEST_DEADLINE),
+                    stream_result if stream else None,
+                    data.get('no_wait', False),
+                    data.get('verify', False),
+                    data.get('known_state'),
+                    data.get('skip_unchanged', False)
+                )
+            if timings is not None:
+                result["timings"] = timings.summary()
+            response = result
+
+        if stream:
+            stream_summary(response, trace=trace)
+        else:
+            print(dumps_traced(response, trace))
+        logger.info("Response sent")
+    except json.JSONDecodeError as e:
+        logger.error(f"Error parsing JSON input: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Invalid JSON input: {str(e)}",
+            "results": []
+        }))
+    except ValueError as e:
+        logger.error(f"Invalid pilot: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Invalid pilot: {str(e)}",
+            "results": []
+        }))
+    except KeyError as e:
+        logger.error(f"Missing required parameter: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Missing required parameter: {str(e)}",
+            "results": []
+        }))
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Unexpected error: {str(e)}",
+            "results": []
+        }))
+    finally:
+        if controller:
+            await controller.close_connections()
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        logger.error(f"Fatal error: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Fatal error: {str(e)}",
+            "results": []
+        }))
@@ -0,0 +1,151 @@
+import time
+import logging
+from pywizlight.scenes import SCENES
+from pywizlight.utils import hex_to_percent
+from typing import Dict, Any, Optional, Callable, Awaitable
+from config import *
+from json_store import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+def pilot_matches(params: Dict[str, Any], state: Dict[str, Any]) -> bool:
+    """Check whether a bulb described by get_lights.describe_state() already reflects params.
+
+    Any parameter this check cannot compare counts as a change, so an unknown
+    key never makes a bulb look unchanged.
+    """
+    if state.get("isOn") != params.get("state", True):
+        return False
+    if not state.get("isOn"):
+        return True
+    if state.get("scene") and "sceneId" not in params and any(key in params for key in ("r", "w", "c", "temp")):
+        return False
+    rgb = state.get("rgb") or [None, None, None]
+    for key, value in params.items():
+        if key == "state":
+            continue
+        if key in ("r", "g", "b"):
+            reported = rgb["rgb".index(key)]
+        elif key == "w":
+            reported = state.get("warmWhite")
+        elif key == "c":
+            reported = state.get("coldWhite")
+        elif key == "dimming":
+            # describe_state reports 0-255; setPilot carries the percent PilotBuilder derived from it
+            brightness = state.get("brightness")
+            reported = max(10, hex_to_percent(brightness)) if brightness is not None else None
+        elif key == "temp":
+            reported = state.get("colorTemp")
+        elif key == "sceneId":
+            # describe_state reports the scene by name
+            value = SCENES.get(value)
+            reported = state.get("scene")
+        else:
+            return False
+        if reported is None or reported != value:
+            return False
+    return True
+
+def unchanged_result(ip: str) -> Dict[str, Any]:
+    """Result reported for a bulb that was left alone because it already matched."""
+    return {
+        "success": True,
+        "ip": ip,
+        "unchanged": True,
+        "message": "Light already in the requested state"
+    }
+
+class PilotCache:
+    """On-disk record of the last pilot each bulb acknowledged, keyed by IP.
+
+    An entry is cleared as soon as a new pilot is sent to the bulb and only
+    written back once the bulb acknowledges it, so a cancelled or failed send
+    never leaves a stale entry behind.
+    """
+
+    def __init__(self, path: str = PILOT_CACHE_FILE, ttl: int = PILOT_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.entries: Dict[str, Dict[str, Any]] = load_json(path, {})
+        self.dirty = False
+
+    def get(self, ip: str) -> Optional[Dict[str, Any]]:
+        """Return the last acknowledged pilot params for a bulb, or None when unknown or expired."""
+        entry = self.entries.get(ip)
+        if entry is None or entry["params"] is None:
+            return None
+        if time.time() - entry["updated_at"] > self.ttl:
+            return None
+        return entry["params"]
+
+    def put(self, ip: str, params: Optional[Dict[str, Any]]) -> None:
+        """Record the params a bulb acknowledged, or None while its state is unknown."""
+        self.entries[ip] = {"params": params, "updated_at": time.time()}
+        self.dirty = True
+
+    def forget(self, ip: str) -> None:
+        """Mark a bulb's state as unknown while a new pilot is on its way."""
+        self.put(ip, None)
+
+    def save(self) -> None:
+        """Merge with entries other processes wrote since loading, newest first, and save."""
+        if not self.dirty:
+            return
+        try:
+            merged = load_json(self.path, {})
+            for ip, entry in self.entries.items():
+                if ip not in merged or merged[ip]["updated_at"] <= entry["updated_at"]:
+                    merged[ip] = entry
+            save_json(self.path, merged)
+            self.entries = merged
+            self.dirty = False
+        except OSError as e:
+            logger.warning(f"Could not save pilot cache: {str(e)}")
+
+class StateDiff:
+    """Decide per bulb whether a pilot would change anything.
+
+    known_state (IP -> the ``state`` object from get_lights or the state
+    tracker) is always consulted; the local PilotCache only when use_cache is set.
+    """
+
+    def __init__(
+        self,
+        cache: PilotCache,
+        params: Dict[str, Any],
+        known_state: Optional[Dict[str, Dict[str, Any]]] = None,
+        use_cache: bool = False
+    ):
+        self.cache = cache
+        self.params = params
+        self.known_state = known_state or {}
+        self.use_cache = use_cache
+
+    def unchanged(self, ip: str) -> bool:
+        """Return True when the bulb is known to already be in the requested state."""
+        if ip in self.known_state:
+            return pilot_matches(self.params, self.known_state[ip])
+        return self.use_cache and self.cache.get(ip) == self.params
+
+    def sending(self, ip: str) -> None:
+        """Note that a pilot is about to be sent, so the cached state is no longer reliable."""
+        self.cache.forget(ip)
+
+    def applied(self, ip: str) -> None:
+        """Note that the bulb acknowledged the pilot."""
+        self.cache.put(ip, self.params)
+
+    def wrap(
+        self,
+        operation: Callable[[Any], Awaitable[Dict[str, Any]]]
+    ) -> Callable[[Any], Awaitable[Dict[str, Any]]]:
+        """Wrap a per-light operation so unchanged bulbs are skipped and successes are cached."""
+        async def wrapped(item: Any) -> Dict[str, Any]:
+            if self.unchanged(item.ip):
+                return unchanged_result(item.ip)
+            self.sending(item.ip)
+            result = await operation(item)
+            if result.get("success", False):
+                self.applied(item.ip)
+            return result
+        return wrapped
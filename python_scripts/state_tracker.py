@@ -0,0 +1,200 @@
+import sys
+import json
+import time
+import asyncio
+import logging
+from pywizlight import wizlight, discovery
+from pywizlight.bulb import PilotParser
+from pywizlight.models import DiscoveredBulb
+from pywizlight.push_manager import PushManager
+from typing import List, Dict, Any, Optional, Callable
+from config import *
+from scheduler import run_operations
+from udp_endpoint import create_light
+from retry_policy import RetryPolicy, deadline_from_budget
+from bulb_health import HealthBoard
+from fire_and_forget import send_without_ack, GET_PILOT_MESSAGE
+from result_stream import write_line
+from tracing import begin_trace, epoch_ms
+from get_lights import BulbInfo, describe_state
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class StateTracker:
+    """In-memory table of bulb state kept current by WiZ push updates.
+
+    Each tracked bulb is polled once to seed the table and then registered for
+    syncPilot pushes, so reading the table never touches the network.
+    """
+
+    def __init__(
+        self,
+        connection_pool: Optional[Dict[str, wizlight]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        health: Optional[HealthBoard] = None,
+        on_change: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        self.semaphore = semaphore or asyncio.Semaphore(MAX_CONCURRENT_CONNECTIONS)
+        self.connection_pool: Dict[str, wizlight] = connection_pool if connection_pool is not None else {}
+        self.health = health if health is not None else HealthBoard()
+        self.retry_policy = RetryPolicy(health=self.health, breaker=False)
+        self.states: Dict[str, Dict[str, Any]] = {}
+        # Tracking tasks started by push announcements, kept so they are not garbage collected
+        self.pending = set()
+        self.on_change = on_change
+
+    async def get_connection(self, ip: str) -> wizlight:
+        """Get or create a connection to a light."""
+        if ip not in self.connection_pool:
+            self.connection_pool[ip] = create_light(ip)
+        return self.connection_pool[ip]
+
+    async def close_connections(self):
+        """Close all connections in the pool, which also cancels push subscriptions."""
+        close_tasks = []
+        for ip, light in self.connection_pool.items():
+            try:
+                close_tasks.append(light.async_close())
+            except Exception as e:
+                logger.error(f"Error closing connection to {ip}: {str(e)}")
+
+        if close_tasks:
+            await asyncio.gather(*close_tasks, return_exceptions=True)
+        self.connection_pool.clear()
+
+    def record(self, light: wizlight, state: PilotParser, source: str) -> None:
+        """Store a bulb's latest state and report it if it changed."""
+        entry = {
+            "ip": light.ip,
+            "mac": light.mac,
+            "state": describe_state(state),
+            "updated_at": time.time(),
+            "source": source
+        }
+        previous = self.states.get(light.ip)
+        self.states[light.ip] = entry
+        if self.on_change and (previous is None or previous["state"] != entry["state"]):
+            self.on_change(entry)
+
+    def on_discovered(self, bulb: DiscoveredBulb) -> None:
+        """Start tracking bulbs that announce themselves after power-on."""
+        if bulb.ip_address not in self.states:
+            logger.info(f"New bulb announced itself: {bulb.ip_address}")
+            task = asyncio.create_task(self.track([{"ip": bulb.ip_address, "mac": bulb.mac_address}]))
+            self.pending.add(task)
+            task.add_done_callback(self.pending.discard)
+
+    async def track_bulb(self, bulb_info: BulbInfo) -> Dict[str, Any]:
+        """Seed one bulb's state and subscribe to its push updates."""
+        try:
+            light = await self.get_connection(bulb_info.ip)
+            if light.mac is None:
+                light.mac = bulb_info.mac or await self.retry_policy.run(self.semaphore, bulb_info, light.getMac)
+
+            state = await self.retry_policy.run(
+                self.semaphore,
+                bulb_info,
+                light.updateState,
+                lambda: send_without_ack(light, GET_PILOT_MESSAGE)
+            )
+            if state:
+                self.record(light, state, "poll")
+
+            push = light.push_running or await light.start_push(
+                lambda pushed, light=light: self.record(light, pushed, "push")
+            )
+            if push:
+                light.set_discovery_callback(self.on_discovered)
+            return {
+                "success": True,
+                "ip": bulb_info.ip,
+                "mac": light.mac,
+                "push": push
+            }
+        except asyncio.TimeoutError:
+            return {
+                "success": False,
+                "ip": bulb_info.ip,
+                "message": f"Operation timed out after {bulb_info.retries + 1} attempts"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "ip": bulb_info.ip,
+                "message": str(e)
+            }
+
+    async def track(self, bulbs: List[Dict[str, Any]], deadline: Optional[float] = REQUEST_DEADLINE) -> Dict[str, Any]:
+        """Start tracking bulbs given as {"ip", "mac"} entries (mac is optional)."""
+        request_deadline = deadline_from_budget(deadline)
+        bulb_infos = [BulbInfo(ip=bulb["ip"], mac=bulb.get("mac"), deadline=request_deadline) for bulb in bulbs]
+        results = await run_operations(bulb_infos, self.track_bulb)
+
+        successful = sum(1 for r in results if isinstance(r, dict) and r.get("success", False))
+        push = PushManager.get().diagnostics
+        return {
+            "overall_success": successful == len(results) and push["running"],
+            "tracking": len(self.states),
+            "push_running": push["running"],
+            "push_fail_reason": push["fail_reason"],
+            "results": results
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current state table without any network round-trip."""
+        return {
+            "success": True,
+            "count": len(self.states),
+            "bulbs": list(self.states.values())
+        }
+
+async def main():
+    tracker = None
+    try:
+        parse_started = epoch_ms()
+        data = json.loads(sys.argv[1]) if len(sys.argv) > 1 else {}
+        trace = begin_trace(data.get('trace_id'), parse_started)
+        logger.info("Parsed input parameters")
+        bulbs = data.get('bulbs') or [{"ip": ip} for ip in data.get('ips', [])]
+
+        if not bulbs:
+            logger.info(f"No bulbs given, discovering using broadcast address: {BROADCAST_ADDRESS}")
+            found = await discovery.find_wizlights(broadcast_address=BROADCAST_ADDRESS)
+            bulbs = [{"ip": bulb.ip_address, "mac": bulb.mac_address} for bulb in found]
+
+        tracker = StateTracker(on_change=lambda entry: write_line({"type": "state", **entry}))
+        result = await tracker.track(bulbs, data.get('deadline', REQUEST_DEADLINE))
+        write_line({"type": "summary", **result}, trace)
+
+        # Push updates arrive on the event loop until the process is stopped
+        await asyncio.Event().wait()
+    except json.JSONDecodeError as e:
+        logger.error(f"Error parsing JSON input: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Invalid JSON input: {str(e)}",
+            "results": []
+        }))
+    finally:
+        if tracker:
+            await tracker.close_connections()
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("State tracker stopped")
+    except Exception as e:
+        logger.error(f"Fatal error: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Fatal error: {str(e)}",
+            "results": []
+        }))
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import functools
+from typing import List, Dict, Any, Callable, Awaitable
+
+# The tests drive the controllers in-process, so the scripts directory must be importable
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, 'benchmarks'))
+
+# Fixed set of light IPs; set TEST_LIGHT_IPS (comma-separated) to test other bulbs,
+# e.g. a benchmarks/wiz_emulator.py fleet
+LIGHT_IPS = os.getenv('TEST_LIGHT_IPS', ','.join([
+    "192.168.18.167",
+    "192.168.18.168",
+    "192.168.18.175",
+    "192.168.18.173",
+    "192.168.18.178",
+    "192.168.18.179"
+])).split(',')
+
+# Pause between consecutive steps of one test module, so the bulbs show each state
+SETTLE_DELAY = float(os.getenv('TEST_SETTLE_DELAY', 0.5))
+
+# Timing of every test call in this process, read by run_tests.py
+TIMINGS: List[Dict[str, Any]] = []
+
+def emulated_fleet(network: str, **profile: Any) -> Any:
+    """Return a wiz_emulator.py fleet (an async context manager) on its own loopback network.
+
+    Behavioural tests that need bulbs in a particular state, or bulbs that
+    misbehave, run against such a fleet instead of LIGHT_IPS. Give every test
+    module its own network so modules can run at the same time.
+    """
+    from wiz_emulator import Emulator
+    return Emulator(network=network, **profile)
+
+def timed(test: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Record the duration and outcome of each call to an async test function."""
+    @functools.wraps(test)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        result = None
+        try:
+            result = await test(*args, **kwargs)
+            return result
+        finally:
+            TIMINGS.append({
+                "module": test.__module__,
+                "test": test.__name__,
+                "args": [arg for arg in args if isinstance(arg, (str, int, float, list, dict))],
+                "success": bool(isinstance(result, dict) and (result.get('overall_success') or result.get('success'))),
+                "started_at": started,
+                "duration_seconds": round(time.perf_counter() - started, 3)
+            })
+    return wrapper
@@ -4,8 +4,11 @@ import importlib
 import json
 import logging
 import os
-from typing import Dict, List, Any, Union
+import sys
+import time
+from typing import Dict, List, Any, Union, Optional
 from datetime import datetime
+import harness
 
 # Configure logging
 logging.basicConfig(
@@ -21,12 +24,44 @@ TEST_MODULES = [
     'test_set_lights_cold_white',
     'test_set_lights_warm_white',
     'test_turn_on_lights',
-    'test_turn_off_lights'
+    'test_turn_off_lights',
+    'test_set_lights_pilot',
+    'test_light_worker',
+    'test_verify',
+    'test_coalescing',
+    'test_transition_lights',
+    'test_shared_endpoint',
+    'test_discover_changes'
+]
+
+# Modules within a group take turns; the groups and all other modules run alongside each other
+SERIAL_GROUPS = [
+    # Modules that change the bulbs in TEST_LIGHT_IPS, so that one module's commands
+    # never land between another module's command and its checks
+    [
+        'test_set_lights_color',
+        'test_set_lights_cold_white',
+        'test_set_lights_warm_white',
+        'test_turn_on_lights',
+        'test_turn_off_lights',
+        'test_set_lights_pilot',
+        'test_light_worker'
+    ],
+    # Discovery listens on the fixed WiZ port, so two discoveries at once get each other's replies
+    [
+        'test_get_lights',
+        'test_discover_changes'
+    ]
 ]
 
 class TestRunner:
+    """Run the test modules in this process and time every module and test."""
+
     def __init__(self):
         self.results = {}
+        self.durations = {}
+        self.started_at = None
+        self.started_clock = 0.0
 
     def format_color_test_result(self, result: List[Dict[str, Any]]) -> str:
         """Format color test results in a human-readable way."""
@@ -47,7 +82,7 @@ class TestRunner:
             if 'results' in test_result:
                 output.append("\nDetails:")
                 for light in test_result['results']:
-                    ip_status = "✅" if light.get('success', False) else "❌"
+                    ip_status = "⏭️" if light.get('superseded', False) else "✅" if light.get('success', False) else "❌"
                     output.append(f"  {ip_status} {light['ip']}: {light.get('message', 'No message')}")
         
         return "\n".join(output)
@@ -71,7 +106,7 @@ class TestRunner:
             if 'results' in test_result:
                 output.append("\nDetails:")
                 for light in test_result['results']:
-                    ip_status = "✅" if light.get('success', False) else "❌"
+                    ip_status = "⏭️" if light.get('superseded', False) else "✅" if light.get('success', False) else "❌"
                     output.append(f"  {ip_status} {light['ip']}: {light.get('message', 'No message')}")
         
         return "\n".join(output)
@@ -94,7 +129,7 @@ class TestRunner:
         if 'results' in test_result:
             output.append("\nDetails:")
             for light in test_result['results']:
-                ip_status = "✅" if light.get('success', False) else "❌"
+                ip_status = "⏭️" if light.get('superseded', False) else "✅" if light.get('success', False) else "❌"
                 output.append(f"  {ip_status} {light['ip']}: {light.get('message', 'No message')}")
         
         return "\n".join(output)
@@ -121,6 +156,7 @@ class TestRunner:
 
     async def run_test_module(self, module_name: str) -> None:
         """Run a single test module and store its results."""
+        started = time.perf_counter()
         try:
             # Import the test module
             module = importlib.import_module(module_name)
@@ -141,6 +177,51 @@ class TestRunner:
                 "success": False,
                 "error": str(e)
             }
+        finally:
+            self.durations[module_name] = round(time.perf_counter() - started, 3)
+
+    async def run_serially(self, module_names: List[str]) -> None:
+        """Run modules one after another."""
+        for module_name in module_names:
+            await self.run_test_module(module_name)
+
+    async def run_all(self, module_names: List[str]) -> float:
+        """Run the modules under one event loop and return the wall time.
+
+        Modules in one of SERIAL_GROUPS take turns with the rest of their group;
+        the others bring their own emulated bulbs, so they run alongside.
+        """
+        self.started_at = datetime.now()
+        self.started_clock = time.perf_counter()
+        grouped = {module_name for group in SERIAL_GROUPS for module_name in group}
+        await asyncio.gather(
+            *(self.run_serially([module_name for module_name in module_names if module_name in group]) for group in SERIAL_GROUPS),
+            *(self.run_test_module(module_name) for module_name in module_names if module_name not in grouped)
+        )
+        # Report in the configured order rather than completion order
+        self.results = {module_name: self.results[module_name] for module_name in module_names}
+        return time.perf_counter() - self.started_clock
+
+    def timing_report(self, total_seconds: float) -> Dict[str, Any]:
+        """Build the machine-readable timing report for the last run."""
+        return {
+            "started_at": self.started_at.isoformat(),
+            "total_seconds": round(total_seconds, 3),
+            "light_ips": harness.LIGHT_IPS,
+            "modules": [
+                {
+                    "module": module_name,
+                    "success": self.check_test_success(module_name, result),
+                    "duration_seconds": self.durations.get(module_name)
+                }
+                for module_name, result in self.results.items()
+            ],
+            "tests": [
+                {**{key: value for key, value in timing.items() if key != "started_at"},
+                 "start_offset_seconds": round(timing["started_at"] - self.started_clock, 3)}
+                for timing in harness.TIMINGS
+            ]
+        }
 
     def format_results(self) -> str:
         """Format all test results in a human-readable way."""
@@ -162,6 +243,8 @@ class TestRunner:
                 output.append(self.format_power_test_result(result))
             elif module_name == 'test_get_lights':
                 output.append(self.format_get_lights_result(result))
+            elif module_name in ['test_light_worker', 'test_set_lights_pilot', 'test_verify', 'test_coalescing', 'test_transition_lights', 'test_shared_endpoint', 'test_discover_changes']:
+                output.extend(self.format_power_test_result(r) for r in result if 'result' in r)
             else:
                 output.append(json.dumps(result, indent=2))
 
@@ -178,23 +261,35 @@ class TestRunner:
                 if not isinstance(result, list):
                     return False
                 return all(r.get('result', {}).get('overall_success', False) for r in result)
+            elif module_name == 'test_light_worker':
+                if not isinstance(result, list) or not result:
+                    return False
+                return all(r.get('result', {}).get('overall_success', False) for r in result)
+            elif module_name in ['test_set_lights_pilot', 'test_verify', 'test_coalescing', 'test_transition_lights', 'test_shared_endpoint', 'test_discover_changes']:
+                if not isinstance(result, list) or not result:
+                    return False
+                return all(r.get('passed', False) for r in result)
             return False
         except Exception as e:
             logger.error(f"Error checking test success: {e}")
             return False
 
-async def main():
-    """Run all tests and display results."""
+async def main(json_path: Optional[str] = None):
+    """Run all tests and display results; with json_path, also write the timing report there."""
     try:
         # Create test runner
         runner = TestRunner()
         
         # Run all test modules
-        for module_name in TEST_MODULES:
-            await runner.run_test_module(module_name)
+        total_seconds = await runner.run_all(TEST_MODULES)
         
         # Format and display results
         print(runner.format_results())
+        logger.info(f"Ran {len(TEST_MODULES)} test modules in {total_seconds:.2f}s")
+        if json_path:
+            with open(json_path, 'w') as f:
+                json.dump(runner.timing_report(total_seconds), f, indent=2)
+            logger.info(f"Timing report written to {json_path}")
         
         # Determine overall success
         all_success = True
@@ -214,5 +309,7 @@ async def main():
 if __name__ == "__main__":
     if asyncio.get_event_loop().is_closed():
         asyncio.set_event_loop(asyncio.new_event_loop())
-    exit_code = asyncio.get_event_loop().run_until_complete(main())
+    # Usage: python run_tests.py [--json timings.json]
+    json_path = sys.argv[sys.argv.index('--json') + 1] if '--json' in sys.argv[:-1] else None
+    exit_code = asyncio.get_event_loop().run_until_complete(main(json_path))
     exit(exit_code)
\ No newline at end of file
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import logging
+from typing import List, Dict, Any
+from pywizlight import PilotBuilder
+from harness import emulated_fleet, timed
+import light_worker
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Emulated bulbs of this module; slow enough that every step of the burst is still in flight
+EMULATOR_NETWORK = "127.82.0.0"
+EMULATOR_LATENCY = 0.1
+
+# A color slider drag: one color command per step, a few milliseconds apart
+BURST_COLORS = [[255, step * 25, 0] for step in range(10)]
+BURST_GAP = 0.01
+
+@timed
+async def test_worker_command(worker: light_worker.LightWorker, command: Dict[str, Any]) -> Dict[str, Any]:
+    """Send one command line to the worker and return its response."""
+    logger.info(f"Sending worker command {command['id']}: {command['command']}")
+    output = await worker.handle_line(json.dumps(command))
+    logger.info(f"Worker result: {json.dumps(output, indent=2)}")
+    return output
+
+async def run_coalescing_tests() -> List[Dict[str, Any]]:
+    """Check that a burst of commands leaves the bulbs on the latest one without reporting failures."""
+    test_results = []
+    async with emulated_fleet(EMULATOR_NETWORK, bulbs=2, latency=EMULATOR_LATENCY, jitter=0) as fleet:
+        ips = fleet.ips
+        worker = light_worker.LightWorker()
+        try:
+            tasks = []
+            for index, color in enumerate(BURST_COLORS):
+                command = {"id": index + 1, "command": "color", "params": {"ips": ips, "color": color}}
+                tasks.append(asyncio.ensure_future(test_worker_command(worker, command)))
+                await asyncio.sleep(BURST_GAP)
+            outputs = await asyncio.gather(*tasks)
+
+            latest = outputs[-1]
+            test_results.append({
+                "test_type": "burst_latest_command",
+                "result": latest,
+                "passed": latest.get('overall_success', False) and latest.get('superseded_operations') == 0
+            })
+
+            earlier = outputs[:-1]
+            test_results.append({
+                "test_type": "burst_superseded_commands",
+                "result": {
+                    "overall_success": all(output.get('overall_success', False) for output in earlier),
+                    "results": [light for output in earlier for light in output.get('results', [])]
+                },
+                "passed": all(
+                    output.get('overall_success', False) and output.get('failed_operations') == 0
+                    for output in earlier
+                ) and sum(output.get('superseded_operations', 0) for output in earlier) > 0
+            })
+
+            # PilotBuilder converts RGB before sending, so compare with the params it sends
+            params = PilotBuilder(rgb=tuple(BURST_COLORS[-1])).set_pilot_message()["params"]
+            expected = {key: params[key] for key in ('r', 'g', 'b')}
+            shown = [{key: bulb.pilot.get(key) for key in ('r', 'g', 'b')} for bulb in fleet.bulbs]
+            test_results.append({
+                "test_type": "burst_final_state",
+                "result": {
+                    "overall_success": shown == [expected] * len(ips),
+                    "results": [{"success": True, "ip": ip, "message": f"Shows {state}"} for ip, state in zip(ips, shown)]
+                },
+                "passed": shown == [expected] * len(ips)
+            })
+
+            # Superseded commands did not fail, so the metrics must not count them as failures
+            outcomes = {outcome: count for (command, outcome), count in worker.metrics.commands.items() if command == 'color'}
+            test_results.append({
+                "test_type": "burst_metrics_outcomes",
+                "result": {
+                    "overall_success": outcomes == {"success": len(BURST_COLORS)},
+                    "results": [{"success": True, "ip": outcome, "message": f"{count} command(s)"} for outcome, count in outcomes.items()]
+                },
+                "passed": outcomes == {"success": len(BURST_COLORS)}
+            })
+        finally:
+            await worker.close_connections()
+
+    return test_results
+
+async def main():
+    """Run the test suite."""
+    try:
+        # Run coalescing tests
+        results = await run_coalescing_tests()
+
+        # Print final results
+        print("\nTest Results:")
+        print(json.dumps(results, indent=2))
+
+        # Return the test results
+        return results
+    except Exception as e:
+        logger.error(f"Test suite failed: {e}")
+        return [{
+            "test_type": "coalescing",
+            "success": False,
+            "error": str(e)
+        }]
+
+if __name__ == "__main__":
+    if asyncio.get_event_loop().is_closed():
+        asyncio.set_event_loop(asyncio.new_event_loop())
+    asyncio.get_event_loop().run_until_complete(main())
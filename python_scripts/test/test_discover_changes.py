@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import logging
+from typing import List, Dict, Any
+from harness import emulated_fleet, timed
+import get_lights
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Emulated bulbs of this module; the second one is dimmed between the full and the incremental discovery
+EMULATOR_NETWORK = "127.85.0.0"
+DIMMED = 40
+
+# Bulb type queries a known bulb must not need again
+BULB_TYPE_METHODS = {'getBulbConfig', 'getModelConfig', 'getSystemConfig', 'getUserConfig'}
+
+def record_requests(fleet: Any) -> List[str]:
+    """Record the method of every request the emulated fleet answers."""
+    methods = []
+    reply = fleet.reply
+
+    def recording(protocol: Any, request: Dict[str, Any], addr: Any) -> None:
+        methods.append(request.get('method'))
+        reply(protocol, request, addr)
+
+    fleet.reply = recording
+    return methods
+
+@timed
+async def test_discover_changes(
+    controller: get_lights.LightDiscovery,
+    known: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Test refreshing a known inventory of the emulated lights."""
+    try:
+        logger.info(f"Testing incremental discovery of {len(known)} known light(s)")
+        output = await controller.discover_changes(known)
+        logger.info(f"Discovery result: {json.dumps(output, indent=2)}")
+        return output
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+async def run_discover_changes_tests() -> List[Dict[str, Any]]:
+    """Check that an inventory without MACs, as the Node side keeps it, is refreshed incrementally."""
+    test_results = []
+    async with emulated_fleet(EMULATOR_NETWORK, bulbs=3, latency=0.002, jitter=0.002) as fleet:
+        # Each discovery runs as its own process; only the bulb type cache on disk carries over
+        controller = get_lights.LightDiscovery(broadcast_address=fleet.broadcast_address)
+        try:
+            discovered = await controller.discover_lights()
+        finally:
+            await controller.close_connections()
+
+        controller = get_lights.LightDiscovery(broadcast_address=fleet.broadcast_address)
+        try:
+            inventory = sorted(discovered.get('bulbs', []), key=lambda bulb: bulb['ip'])
+            known = [{key: value for key, value in bulb.items() if key != 'mac'} for bulb in inventory]
+            fleet.bulbs[1].handle('setPilot', {"dimming": DIMMED})
+
+            methods = record_requests(fleet)
+            result = await test_discover_changes(controller, known)
+            changed = result.get('changed', [])
+            test_results.append({
+                "test_type": "discover_changes_without_mac",
+                "result": result,
+                "passed": result.get('success', False)
+                    and len(inventory) == len(fleet.bulbs)
+                    and [bulb['ip'] for bulb in changed] == [fleet.bulbs[1].ip]
+                    and [bulb.get('mac') for bulb in changed] == [fleet.bulbs[1].mac]
+                    and result.get('unchanged') == len(fleet.bulbs) - 1
+                    and not result.get('added') and not result.get('removed')
+            })
+
+            bulb_type_queries = [method for method in methods if method in BULB_TYPE_METHODS]
+            test_results.append({
+                "test_type": "discover_changes_cached_metadata",
+                "result": {
+                    "success": not bulb_type_queries,
+                    "results": [{"success": True, "ip": method, "message": "Bulb type query"} for method in bulb_type_queries]
+                },
+                "passed": not bulb_type_queries
+            })
+        finally:
+            await controller.close_connections()
+
+    return test_results
+
+async def main():
+    """Run the test suite."""
+    try:
+        # Run incremental discovery tests
+        results = await run_discover_changes_tests()
+
+        # Print final results
+        print("\nTest Results:")
+        print(json.dumps(results, indent=2))
+
+        # Return the test results
+        return results
+    except Exception as e:
+        logger.error(f"Test suite failed: {e}")
+        return [{
+            "test_type": "discover_changes",
+            "success": False,
+            "error": str(e)
+        }]
+
+if __name__ == "__main__":
+    if asyncio.get_event_loop().is_closed():
+        asyncio.set_event_loop(asyncio.new_event_loop())
+    asyncio.get_event_loop().run_until_complete(main())
@@ -2,9 +2,9 @@
 import asyncio
 import json
 import logging
-import subprocess
-import os
 from typing import Dict, Any
+from harness import timed
+import get_lights
 
 # Configure logging
 logging.basicConfig(
@@ -13,56 +13,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@timed
 async def test_get_lights() -> Dict[str, Any]:
-    """Test the get_lights.py script."""
+    """Test light discovery."""
+    discovery = get_lights.LightDiscovery()
     try:
-        logger.info("Testing get_lights.py")
-        
-        # Run the get_lights.py script from parent directory
-        result = subprocess.run(
-            ['python3', '../get_lights.py'],
-            capture_output=True,
-            text=True,
-            cwd=os.path.dirname(os.path.abspath(__file__)),  # Ensure correct working directory
-            env={**os.environ, 'PYTHONPATH': os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}  # Add parent dir to PYTHONPATH
-        )
-        
-        if result.stderr:
-            logger.warning(f"Script stderr: {result.stderr}")
-        
-        if not result.stdout:
-            return {
-                "success": False,
-                "error": "No output from script",
-                "stderr": result.stderr
-            }
-        
-        # Parse the JSON output
-        output = json.loads(result.stdout)
-        
+        logger.info("Testing get_lights")
+        output = await discovery.discover_lights()
         logger.info(f"Get lights result: {json.dumps(output, indent=2)}")
         return output
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error running get_lights.py: {e}")
-        return {
-            "success": False,
-            "error": str(e),
-            "stdout": e.stdout if hasattr(e, 'stdout') else None,
-            "stderr": e.stderr if hasattr(e, 'stderr') else None
-        }
-    except json.JSONDecodeError as e:
-        logger.error(f"Error parsing output: {e}")
-        return {
-            "success": False,
-            "error": f"Invalid JSON output: {str(e)}",
-            "raw_output": result.stdout if 'result' in locals() else None
-        }
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         return {
             "success": False,
             "error": str(e)
         }
+    finally:
+        await discovery.close_connections()
 
 async def main():
     """Run the test suite."""
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import logging
+from typing import List, Dict, Any
+from harness import LIGHT_IPS, SETTLE_DELAY, timed
+import light_worker
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Commands sent to a single worker, in order
+WORKER_COMMANDS = [
+    {"id": 1, "command": "turn_on", "params": {"ips": LIGHT_IPS}},
+    {"id": 2, "command": "color", "params": {"ips": LIGHT_IPS, "color": [255, 0, 0]}},
+    {"id": 3, "command": "warm_white", "params": {"ips": LIGHT_IPS, "intensity": 128}},
+    {"id": 4, "command": "cold_white", "params": {"ips": LIGHT_IPS, "intensity": 128}},
+    {"id": 5, "command": "turn_off", "params": {"ips": LIGHT_IPS}}
+]
+
+@timed
+async def test_worker_command(worker: light_worker.LightWorker, command: Dict[str, Any]) -> Dict[str, Any]:
+    """Send one command line to the worker and return its response."""
+    logger.info(f"Sending worker command: {command['command']}")
+    output = await worker.handle_line(json.dumps(command))
+    logger.info(f"Worker result: {json.dumps(output, indent=2)}")
+    return output
+
+async def test_light_worker() -> List[Dict[str, Any]]:
+    """Test sending several commands to one long-lived worker."""
+    test_results = []
+    worker = light_worker.LightWorker()
+    try:
+        for command in WORKER_COMMANDS:
+            output = await test_worker_command(worker, command)
+            test_results.append({
+                "test_type": f"worker_{command['command']}",
+                "result": output
+            })
+            # Let the lights show each state before the next command
+            await asyncio.sleep(SETTLE_DELAY)
+
+        return test_results
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return test_results + [{
+            "test_type": "worker",
+            "success": False,
+            "error": str(e)
+        }]
+    finally:
+        await worker.close_connections()
+
+async def main():
+    """Run the test suite."""
+    try:
+        # Run worker tests
+        results = await test_light_worker()
+
+        # Print final results
+        print("\nTest Results:")
+        print(json.dumps(results, indent=2))
+
+        # Return the test results
+        return results
+    except Exception as e:
+        logger.error(f"Test suite failed: {e}")
+        return [{
+            "test_type": "worker",
+            "success": False,
+            "error": str(e)
+        }]
+
+if __name__ == "__main__":
+    if asyncio.get_event_loop().is_closed():
+        asyncio.set_event_loop(asyncio.new_event_loop())
+    asyncio.get_event_loop().run_until_complete(main())
@@ -2,10 +2,10 @@
 import asyncio
 import json
 import logging
-import subprocess
 import random
 from typing import List, Dict, Any
-import time
+from harness import LIGHT_IPS, SETTLE_DELAY, timed
+import set_lights_warm_white
 
 # Configure logging
 logging.basicConfig(
@@ -14,64 +14,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Fixed set of light IPs
-LIGHT_IPS = [
-    "192.168.18.167",
-    "192.168.18.168",
-    "192.168.18.175",
-    "192.168.18.173",
-    "192.168.18.178",
-    "192.168.18.179"
-]
-
 def generate_random_intensity() -> int:
     """Generate a random intensity value between 0 and 255."""
     return random.randint(0, 255)
 
+@timed
 async def test_set_intensity(intensity: int) -> Dict[str, Any]:
     """Test setting a specific warm white intensity for all lights."""
+    controller = set_lights_warm_white.LightController()
     try:
-        # Prepare the input data
-        input_data = {
-            "ips": LIGHT_IPS,
-            "intensity": intensity
-        }
-        
         logger.info(f"Testing warm white intensity: {intensity}")
-        
-        # Run the set_lights_warm_white.py script
-        result = subprocess.run(
-            ['python3', '../set_lights_warm_white.py', json.dumps(input_data)],
-            capture_output=True,
-            text=True
-        )
-        
-        # Parse the JSON output
-        output = json.loads(result.stdout)
-        
+        output = await controller.set_lights_warm_white(LIGHT_IPS, intensity)
         logger.info(f"Intensity set result: {json.dumps(output, indent=2)}")
         return output
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error running set_lights_warm_white.py: {e}")
-        return {
-            "success": False,
-            "error": str(e),
-            "stdout": e.stdout if hasattr(e, 'stdout') else None,
-            "stderr": e.stderr if hasattr(e, 'stderr') else None
-        }
-    except json.JSONDecodeError as e:
-        logger.error(f"Error parsing output: {e}")
-        return {
-            "success": False,
-            "error": f"Invalid JSON output: {str(e)}",
-            "raw_output": result.stdout if 'result' in locals() else None
-        }
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         return {
             "success": False,
             "error": str(e)
         }
+    finally:
+        await controller.close_connections()
 
 async def run_intensity_tests() -> List[Dict[str, Any]]:
     """Run a series of warm white intensity tests."""
@@ -98,8 +61,8 @@ async def run_intensity_tests() -> List[Dict[str, Any]]:
             "intensity": intensity,
             "result": result
         })
-        # Wait between tests to avoid overwhelming the lights
-        await asyncio.sleep(2)
+        # Let the lights show the intensity before the next one
+        await asyncio.sleep(SETTLE_DELAY)
     
     return test_results
 
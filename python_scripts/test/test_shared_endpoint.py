@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import logging
+from typing import List, Dict, Any
+from harness import emulated_fleet, timed
+import set_lights_pilot
+from bulb_health import HealthBoard
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Emulated bulbs of this module; slow enough that both controllers' requests are in flight together
+EMULATOR_NETWORK = "127.84.0.0"
+EMULATOR_LATENCY = 0.05
+
+# The bulbs never answer LOST_PILOT, so only ANSWERED_PILOT may be acknowledged
+LOST_PILOT = {"colortemp": 2700}
+ANSWERED_PILOT = {"rgb": [0, 0, 255]}
+LOST_DEADLINE = 0.5
+
+def drop_requests(fleet: Any, key: str) -> None:
+    """Make an emulated fleet ignore setPilot requests carrying a param, as if they were lost."""
+    reply = fleet.reply
+
+    def dropping(protocol: Any, request: Dict[str, Any], addr: Any) -> None:
+        if request.get('method') == 'setPilot' and key in (request.get('params') or {}):
+            return
+        reply(protocol, request, addr)
+
+    fleet.reply = dropping
+
+@timed
+async def test_set_pilot(
+    controller: set_lights_pilot.LightController,
+    ips: List[str],
+    pilot: Dict[str, Any],
+    **options: Any
+) -> Dict[str, Any]:
+    """Test sending one pilot to the emulated lights."""
+    try:
+        logger.info(f"Testing pilot {pilot} with {options}")
+        output = await controller.set_lights_pilot(ips, pilot, **options)
+        logger.info(f"Pilot set result: {json.dumps(output, indent=2)}")
+        return output
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+async def run_shared_endpoint_tests() -> List[Dict[str, Any]]:
+    """Check that controllers in one process are only acknowledged by replies to their own requests."""
+    test_results = []
+    async with emulated_fleet(EMULATOR_NETWORK, bulbs=2, latency=EMULATOR_LATENCY, jitter=0) as fleet:
+        ips = fleet.ips
+        drop_requests(fleet, 'temp')
+        # Without RTT history an attempt lasts until the deadline, so no request times out waiting its turn
+        health = HealthBoard()
+        for ip in ips:
+            health.entries.pop(ip, None)
+        lost = set_lights_pilot.LightController(health=health)
+        answered = set_lights_pilot.LightController(health=health)
+        try:
+            # Requests to one bulb take turns, so the answered pilot goes out once the lost one times out
+            lost_task = asyncio.ensure_future(test_set_pilot(lost, ips, LOST_PILOT, deadline=LOST_DEADLINE))
+            await asyncio.sleep(EMULATOR_LATENCY / 5)
+            answered_result, lost_result = await asyncio.gather(
+                test_set_pilot(answered, ips, ANSWERED_PILOT, deadline=LOST_DEADLINE * 3),
+                lost_task
+            )
+
+            test_results.append({
+                "test_type": "shared_endpoint_answered",
+                "result": answered_result,
+                "passed": answered_result.get('overall_success', False)
+                    and answered_result.get('successful_operations') == len(ips)
+            })
+            test_results.append({
+                "test_type": "shared_endpoint_not_cross_acked",
+                "result": lost_result,
+                "passed": lost_result.get('successful_operations') == 0
+            })
+        finally:
+            await asyncio.gather(lost.close_connections(), answered.close_connections())
+
+    return test_results
+
+async def main():
+    """Run the test suite."""
+    try:
+        # Run shared endpoint tests
+        results = await run_shared_endpoint_tests()
+
+        # Print final results
+        print("\nTest Results:")
+        print(json.dumps(results, indent=2))
+
+        # Return the test results
+        return results
+    except Exception as e:
+        logger.error(f"Test suite failed: {e}")
+        return [{
+            "test_type": "shared_endpoint",
+            "success": False,
+            "error": str(e)
+        }]
+
+if __name__ == "__main__":
+    if asyncio.get_event_loop().is_closed():
+        asyncio.set_event_loop(asyncio.new_event_loop())
+    asyncio.get_event_loop().run_until_complete(main())
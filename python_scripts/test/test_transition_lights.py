@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import logging
+from typing import List, Dict, Any
+from harness import emulated_fleet, timed
+import transition_lights
+from config import BULB_MAX_PPS
+from pilots import pilot_message
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Emulated bulbs of this module
+EMULATOR_NETWORK = "127.83.0.0"
+
+START = {"brightness": 255, "colortemp": 2700}
+END = {"brightness": 10, "colortemp": 6500}
+
+@timed
+async def test_transition(
+    controller: transition_lights.LightController,
+    ips: List[str],
+    **options: Any
+) -> Dict[str, Any]:
+    """Test fading the emulated lights from START to END."""
+    try:
+        logger.info(f"Testing transition with {options}")
+        output = await controller.transition_lights(ips, END, start=START, **options)
+        logger.info(f"Transition result: {json.dumps(output, indent=2)}")
+        return output
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+def shows_end(bulb: Any) -> bool:
+    """Return True when an emulated bulb shows the END pilot."""
+    return all(bulb.pilot.get(key) == value for key, value in pilot_message(END)["params"].items())
+
+async def run_transition_tests() -> List[Dict[str, Any]]:
+    """Check frame playback against the request deadline and its inputs."""
+    test_results = []
+    async with emulated_fleet(EMULATOR_NETWORK, bulbs=2, latency=0.002, jitter=0.002) as fleet:
+        ips = fleet.ips
+        controller = transition_lights.LightController()
+        try:
+            # The fade would outlast the deadline; playback has to leave time for the end pilot
+            result = await test_transition(controller, ips, duration=2, deadline=1.5)
+            test_results.append({
+                "test_type": "transition_duration_past_deadline",
+                "result": result,
+                "passed": result.get('overall_success', False)
+                    and result.get('frames_skipped', 0) > 0
+                    and all(shows_end(bulb) for bulb in fleet.bulbs)
+            })
+
+            # Frames faster than a bulb may be sent were dropped by design; the frame rate is clamped instead
+            for test_type, options in (("transition_default_fps", {}), ("transition_fps_clamped", {"fps": BULB_MAX_PPS * 5})):
+                result = await test_transition(controller, ips, duration=1, **options)
+                test_results.append({
+                    "test_type": test_type,
+                    "result": result,
+                    "passed": result.get('overall_success', False)
+                        and result.get('fps', 0) <= BULB_MAX_PPS
+                        and result.get('packets_dropped') == 0
+                })
+
+            result = await test_transition(controller, ips, duration=1, fps=0)
+            test_results.append({
+                "test_type": "transition_fps_zero",
+                "result": result,
+                "passed": not result.get('overall_success', True)
+                    and result.get('message') == "fps must be a number greater than 0"
+            })
+
+            # A bulb that does not answer fails once per transition, not once for the read and again for the send
+            dead_ip = ips[0]
+            fleet.bulbs[0].dead = True
+            failures = controller.health.entry(dead_ip)["consecutive_failures"]
+            result = await controller.transition_lights(ips, END, duration=0.5, deadline=2)
+            counted = controller.health.entry(dead_ip)["consecutive_failures"] - failures
+            fleet.bulbs[0].dead = False
+            test_results.append({
+                "test_type": "transition_unreachable_counts_once",
+                "result": result,
+                "passed": counted == 1
+            })
+        finally:
+            await controller.close_connections()
+
+    return test_results
+
+async def main():
+    """Run the test suite."""
+    try:
+        # Run transition tests
+        results = await run_transition_tests()
+
+        # Print final results
+        print("\nTest Results:")
+        print(json.dumps(results, indent=2))
+
+        # Return the test results
+        return results
+    except Exception as e:
+        logger.error(f"Test suite failed: {e}")
+        return [{
+            "test_type": "transition",
+            "success": False,
+            "error": str(e)
+        }]
+
+if __name__ == "__main__":
+    if asyncio.get_event_loop().is_closed():
+        asyncio.set_event_loop(asyncio.new_event_loop())
+    asyncio.get_event_loop().run_until_complete(main())
@@ -2,9 +2,9 @@
 import asyncio
 import json
 import logging
-import subprocess
 from typing import Dict, Any
-import time
+from harness import LIGHT_IPS, SETTLE_DELAY, timed
+import turn_on_lights
 
 # Configure logging
 logging.basicConfig(
@@ -13,59 +13,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Fixed set of light IPs
-LIGHT_IPS = [
-    "192.168.18.167",
-    "192.168.18.168",
-    "192.168.18.175",
-    "192.168.18.173",
-    "192.168.18.178",
-    "192.168.18.179"
-]
-
+@timed
 async def test_turn_on_lights() -> Dict[str, Any]:
     """Test turning on all lights."""
+    controller = turn_on_lights.LightController()
     try:
-        # Prepare the input data
-        input_data = {
-            "ips": LIGHT_IPS
-        }
-        
         logger.info("Testing turning on all lights")
-        
-        # Run the turn_on_lights.py script
-        result = subprocess.run(
-            ['python3', '../turn_on_lights.py', json.dumps(input_data)],
-            capture_output=True,
-            text=True
-        )
-        
-        # Parse the JSON output
-        output = json.loads(result.stdout)
-        
+        output = await controller.turn_on_lights(LIGHT_IPS)
         logger.info(f"Turn on result: {json.dumps(output, indent=2)}")
         return output
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error running turn_on_lights.py: {e}")
-        return {
-            "success": False,
-            "error": str(e),
-            "stdout": e.stdout if hasattr(e, 'stdout') else None,
-            "stderr": e.stderr if hasattr(e, 'stderr') else None
-        }
-    except json.JSONDecodeError as e:
-        logger.error(f"Error parsing output: {e}")
-        return {
-            "success": False,
-            "error": f"Invalid JSON output: {str(e)}",
-            "raw_output": result.stdout if 'result' in locals() else None
-        }
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         return {
             "success": False,
             "error": str(e)
         }
+    finally:
+        await controller.close_connections()
 
 async def run_power_tests() -> Dict[str, Any]:
     """Run power control tests."""
@@ -74,7 +38,7 @@ async def run_power_tests() -> Dict[str, Any]:
         result = await test_turn_on_lights()
         
         # Wait a moment to ensure the operation completes
-        await asyncio.sleep(2)
+        await asyncio.sleep(SETTLE_DELAY)
         
         return {
             "test_type": "turn_on",
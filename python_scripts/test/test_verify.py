@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import logging
+from typing import List, Dict, Any
+from harness import emulated_fleet, timed
+import set_lights_pilot
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Emulated bulbs of this module; the first one stops applying setPilot
+EMULATOR_NETWORK = "127.81.0.0"
+
+# (test type, pilot putting the bulbs in one mode, pilot whose values that mode does not report)
+MODE_CASES = [
+    ("verify_temp_in_rgb_mode", {"rgb": [255, 0, 0], "brightness": 255}, {"colortemp": 2700}),
+    ("verify_warm_white_in_temp_mode", {"colortemp": 6500, "brightness": 255}, {"warm_white": 128})
+]
+
+def freeze(bulb: Any) -> None:
+    """Make an emulated bulb acknowledge setPilot without applying it, as if the change were lost."""
+    handle = bulb.handle
+
+    def frozen(method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        if method == 'setPilot':
+            return {"method": method, "env": "pro", "result": {"success": True}}
+        return handle(method, params)
+
+    bulb.handle = frozen
+
+def thaw(bulb: Any) -> None:
+    """Make a frozen emulated bulb apply setPilot again."""
+    bulb.__dict__.pop('handle', None)
+
+@timed
+async def test_set_pilot(
+    controller: set_lights_pilot.LightController,
+    ips: List[str],
+    pilot: Dict[str, Any],
+    **options: Any
+) -> Dict[str, Any]:
+    """Test sending one pilot to the emulated lights."""
+    try:
+        logger.info(f"Testing pilot {pilot} with {options}")
+        output = await controller.set_lights_pilot(ips, pilot, **options)
+        logger.info(f"Pilot set result: {json.dumps(output, indent=2)}")
+        return output
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+def applied(result: Dict[str, Any]) -> Dict[str, bool]:
+    """Map each IP of a verified result to whether the bulb confirmed the change."""
+    return {light['ip']: bool(light.get('applied')) for light in result.get('results', [])}
+
+async def run_verify_tests() -> List[Dict[str, Any]]:
+    """Check that verify only confirms pilots a bulb reports back in full."""
+    test_results = []
+    async with emulated_fleet(EMULATOR_NETWORK, bulbs=2, latency=0.002, jitter=0.002) as fleet:
+        ips = fleet.ips
+        frozen_ip, working_ip = ips
+        controller = set_lights_pilot.LightController()
+        try:
+            for ip in ips:
+                controller.pilot_cache.forget(ip)
+
+            result = await test_set_pilot(controller, ips, {"rgb": [255, 0, 0], "brightness": 255}, no_wait=True, verify=True)
+            test_results.append({
+                "test_type": "verify_applied",
+                "result": result,
+                "passed": applied(result) == {ip: True for ip in ips}
+            })
+
+            # The frozen bulb keeps showing the mode it was put in, which does not report the new values
+            for test_type, baseline, pilot in MODE_CASES:
+                thaw(fleet.bulbs[0])
+                await test_set_pilot(controller, ips, baseline)
+                freeze(fleet.bulbs[0])
+                result = await test_set_pilot(controller, ips, pilot, no_wait=True, verify=True)
+                test_results.append({
+                    "test_type": test_type,
+                    "result": result,
+                    "passed": applied(result) == {frozen_ip: False, working_ip: True}
+                        and controller.pilot_cache.get(frozen_ip) is None
+                        and controller.pilot_cache.get(working_ip) is not None
+                })
+
+            # An unconfirmed pilot must not let skip_unchanged skip the bulb next time
+            result = await test_set_pilot(controller, ips, {"warm_white": 128}, no_wait=True, skip_unchanged=True)
+            unchanged = {light['ip']: bool(light.get('unchanged')) for light in result.get('results', [])}
+            test_results.append({
+                "test_type": "skip_unchanged_after_unconfirmed",
+                "result": result,
+                "passed": unchanged == {frozen_ip: False, working_ip: True}
+            })
+        finally:
+            await controller.close_connections()
+
+    return test_results
+
+async def main():
+    """Run the test suite."""
+    try:
+        # Run verify tests
+        results = await run_verify_tests()
+
+        # Print final results
+        print("\nTest Results:")
+        print(json.dumps(results, indent=2))
+
+        # Return the test results
+        return results
+    except Exception as e:
+        logger.error(f"Test suite failed: {e}")
+        return [{
+            "test_type": "verify",
+            "success": False,
+            "error": str(e)
+        }]
+
+if __name__ == "__main__":
+    if asyncio.get_event_loop().is_closed():
+        asyncio.set_event_loop(asyncio.new_event_loop())
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,95 @@
+import math
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Iterator, Awaitable, Tuple
+from tracing import traced_phase
+
+# The recorder of the request running in the current task, if it asked for timings.
+# Tasks copy the context they are created in, so concurrent worker commands each
+# record into their own recorder.
+current_timings: contextvars.ContextVar[Optional['RequestTimings']] = contextvars.ContextVar('current_timings', default=None)
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return the pct-th percentile of values using nearest-rank."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def histogram(values: List[float]) -> Dict[str, Any]:
+    """Summarise durations in seconds as count, p50, p95 and max."""
+    if not values:
+        return {"count": 0, "p50": None, "p95": None, "max": None}
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "max": round(max(values), 4)
+    }
+
+class RequestTimings:
+    """Counters and durations for one request, reported as its `timings` block.
+
+    RetryPolicy records every attempt: the time spent waiting for a semaphore
+    slot, the round-trip time of each acknowledged attempt (per bulb), timeouts
+    and retries. Phases such as the discovery broadcast are recorded by name.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queue_waits: List[float] = []
+        self.rtts: List[Tuple[str, float]] = []
+        self.timeouts = 0
+        self.retries = 0
+        self.phases: Dict[str, float] = {}
+
+    def record_queue_wait(self, seconds: float) -> None:
+        self.queue_waits.append(seconds)
+
+    def record_rtt(self, ip: str, seconds: float) -> None:
+        self.rtts.append((ip, seconds))
+
+    def record_timeout(self) -> None:
+        self.timeouts += 1
+
+    def record_retry(self) -> None:
+        self.retries += 1
+
+    def record_phase(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def summary(self) -> Dict[str, Any]:
+        """Build the `timings` block; all durations are in seconds."""
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 4),
+            "attempts": len(self.queue_waits),
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "rtt_seconds": histogram([seconds for _, seconds in self.rtts]),
+            "queue_wait_seconds": histogram(self.queue_waits),
+            **{f"{name}_seconds": round(seconds, 4) for name, seconds in self.phases.items()}
+        }
+
+@contextmanager
+def collect_timings(enabled: bool = True) -> Iterator[Optional[RequestTimings]]:
+    """Record timings for the code run inside the block, yielding the recorder (None when disabled)."""
+    if not enabled:
+        yield None
+        return
+    timings = RequestTimings()
+    token = current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        current_timings.reset(token)
+
+async def timed_phase(name: str, awaitable: Awaitable[Any]) -> Any:
+    """Await awaitable, recording its duration as a named phase (and trace span) of the current request."""
+    started = time.perf_counter()
+    try:
+        with traced_phase(name):
+            return await awaitable
+    finally:
+        timings = current_timings.get()
+        if timings is not None:
+            timings.record_phase(name, time.perf_counter() - started)
@@ -0,0 +1,112 @@
+import json
+import time
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Iterator
+
+# The trace of the request running in the current task, if it passed a trace_id
+current_trace: contextvars.ContextVar[Optional['Trace']] = contextvars.ContextVar('current_trace', default=None)
+
+def epoch_ms() -> float:
+    """Wall clock in milliseconds since the epoch, comparable with Date.now() on the Node side."""
+    return time.time() * 1000
+
+class Trace:
+    """Phase spans of one request, tagged with the caller's trace ID.
+
+    Spans are aggregated per phase: each reports when the phase was first
+    entered and last left, in epoch milliseconds, how often it ran and its
+    summed duration. Phases that run once per bulb (connect, send, ack,
+    retry) therefore stay one entry each, however many bulbs a request has.
+    """
+
+    def __init__(self, trace_id: str):
+        self.trace_id = str(trace_id)
+        self.spans: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, name: str, start_ms: float, end_ms: float) -> None:
+        span = self.spans.get(name)
+        if span is None:
+            self.spans[name] = {"start_ms": start_ms, "end_ms": end_ms, "count": 1, "total_ms": end_ms - start_ms}
+            return
+        span["start_ms"] = min(span["start_ms"], start_ms)
+        span["end_ms"] = max(span["end_ms"], end_ms)
+        span["count"] += 1
+        span["total_ms"] += end_ms - start_ms
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Record the block as one run of the named phase."""
+        start_ms = epoch_ms()
+        try:
+            yield
+        finally:
+            self.record(name, start_ms, epoch_ms())
+
+    def summary(self) -> Dict[str, Any]:
+        """Build the `trace` block of a response."""
+        spans = sorted(self.spans.items(), key=lambda item: item[1]["start_ms"])
+        return {
+            "trace_id": self.trace_id,
+            "spans": [
+                {
+                    "name": name,
+                    "start_ms": round(span["start_ms"], 1),
+                    "end_ms": round(span["end_ms"], 1),
+                    "count": span["count"],
+                    "total_ms": round(span["total_ms"], 1)
+                }
+                for name, span in spans
+            ]
+        }
+
+def begin_trace(trace_id: Optional[str], parse_started_ms: Optional[float] = None) -> Optional[Trace]:
+    """Make trace_id the current task's trace, recording the input parse that revealed it.
+
+    Without a trace_id the current task is left untraced, so a previous
+    request's trace cannot carry over.
+    """
+    trace = Trace(trace_id) if trace_id else None
+    current_trace.set(trace)
+    if trace is not None and parse_started_ms is not None:
+        trace.record('parse', parse_started_ms, epoch_ms())
+    return trace
+
+@contextmanager
+def traced_phase(name: str) -> Iterator[None]:
+    """Record the block as a phase of the current trace, if there is one."""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
+
+def dumps_traced(response: Dict[str, Any], trace: Optional[Trace] = None) -> str:
+    """Serialize a response, adding the `trace` block when the request is traced.
+
+    The serialize span has to end before the trace block is written, so the
+    block is appended to the already serialized response instead of
+    serializing everything twice.
+    """
+    if trace is None:
+        return json.dumps(response)
+    with trace.span('serialize'):
+        body = json.dumps(response)
+    separator = ", " if body != "{}" else ""
+    return f'{body[:-1]}{separator}"trace": {json.dumps(trace.summary())}}}'
+
+# Tag every log line written while a traced request runs with its trace ID
+_record_factory = logging.getLogRecordFactory()
+
+def traced_record(*args, **kwargs) -> logging.LogRecord:
+    record = _record_factory(*args, **kwargs)
+    trace = current_trace.get()
+    record.trace_id = trace.trace_id if trace is not None else None
+    if trace is not None and isinstance(record.msg, str):
+        prefix = f"[trace {trace.trace_id}] "
+        record.msg = (prefix.replace('%', '%%') if record.args else prefix) + record.msg
+    return record
+
+logging.setLogRecordFactory(traced_record)
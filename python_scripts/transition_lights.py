@@ -0,0 +1,201 @@
+import sys
+import json
+import asyncio
+import logging
+from pywizlight import wizlight
+from typing import List, Dict, Any, Optional, Callable
+from config import *
+from scheduler import run_operations
+from retry_policy import RetryPolicy, deadline_from_budget
+from bulb_health import HealthBoard
+from result_stream import stream_result, stream_summary
+from timings import collect_timings, timed_phase
+from tracing import begin_trace, dumps_traced, epoch_ms
+from coalescing import Coalescer, summarize_results
+from state_diff import PilotCache, StateDiff
+from fire_and_forget import send_without_ack, GET_PILOT_MESSAGE
+from pilots import pilot_message, spec_from_state
+from transitions import FramePlayer, interpolate, playable_fps, playback_deadline, valid_fps
+import set_lights_bulk
+from set_lights_bulk import LightOperation
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class LightController(set_lights_bulk.LightController):
+    """Fade groups of lights between two pilot specs.
+
+    Intermediate frames are sent without acks by a FramePlayer; only the final
+    state is sent with retries, so every bulb ends up at the end pilot.
+    """
+
+    completed_message = "Light transition completed successfully"
+
+    def __init__(
+        self,
+        connection_pool: Optional[Dict[str, wizlight]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        health: Optional[HealthBoard] = None,
+        coalescer: Optional[Coalescer] = None,
+        pilot_cache: Optional[PilotCache] = None
+    ):
+        super().__init__(connection_pool, semaphore, health, coalescer, pilot_cache)
+        # Reading start states must not hold up the fade for bulbs that never answer, and the
+        # end pilot's send already counts a failure, so the read leaves the breakers alone
+        self.read_policy = RetryPolicy(attempts=0, attempt_timeout=TRANSITION_READ_TIMEOUT, health=self.health, breaker=False)
+
+    async def read_start(self, operation: LightOperation) -> Dict[str, Any]:
+        """Read a light's current pilot as the start of its fade, or jump straight to the end."""
+        try:
+            light = await self.get_connection(operation.ip)
+            state = await self.read_policy.run(
+                self.semaphore,
+                operation,
+                light.updateState,
+                lambda: send_without_ack(light, GET_PILOT_MESSAGE)
+            )
+            if state is not None:
+                return spec_from_state(state)
+        except Exception as e:
+            logger.warning(f"Could not read current state of {operation.ip}, skipping its fade: {str(e)}")
+        return operation.pilot
+
+    async def transition_lights(
+        self,
+        ips: List[str],
+        end: Dict[str, Any],
+        duration: float = TRANSITION_DURATION,
+        start: Optional[Dict[str, Any]] = None,
+        fps: float = TRANSITION_FPS,
+        deadline: Optional[float] = REQUEST_DEADLINE,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Fade multiple lights from start (or their current state) to end over duration seconds."""
+        if not valid_fps(fps):
+            logger.warning(f"Invalid fps: {fps!r}")
+            return {
+                "overall_success": False,
+                "message": "fps must be a number greater than 0",
+                "results": []
+            }
+        fps = playable_fps(fps)
+        request_deadline = deadline_from_budget(deadline)
+        operations = [LightOperation(ip=ip, pilot=end, deadline=request_deadline) for ip in ips]
+        claimed = self.coalescer.claim(ips) if self.coalescer is not None else None
+        diff = StateDiff(self.pilot_cache, pilot_message(end)["params"])
+        for ip in ips:
+            diff.sending(ip)
+
+        if start is None:
+            starts = await run_operations(operations, self.read_start)
+            starts = {ip: spec if isinstance(spec, dict) else end for ip, spec in zip(ips, starts)}
+        else:
+            starts = {ip: start for ip in ips}
+
+        def render(frame: int) -> Dict[str, Dict[str, Any]]:
+            progress = frame / frame_count
+            return {
+                ip: interpolate(starts[ip], end, progress)
+                for ip in ips
+                if claimed is None or self.coalescer.is_current(ip, claimed[ip])
+            }
+
+        frame_count = max(0, round(duration * fps))
+        lights = {ip: await self.get_connection(ip) for ip in ips}
+        playback = await timed_phase('frames', FramePlayer(fps).play(lights, render, frame_count, playback_deadline(request_deadline)))
+
+        run_light = diff.wrap(self.set_light_pilot)
+        if self.coalescer is not None:
+            run_light = self.coalescer.latest_wins(ips, run_light, claimed=claimed)
+        results = await run_operations(operations, run_light, on_result=on_result)
+        self.health.save()
+        self.pilot_cache.save()
+
+        return {
+            **summarize_results(results),
+            **playback,
+            "hedges_sent": sum(operation.hedges for operation in operations),
+            "results": results
+        }
+
+async def main():
+    controller = None
+    try:
+        parse_started = epoch_ms()
+        data = json.loads(sys.argv[1])
+        trace = begin_trace(data.get('trace_id'), parse_started)
+        logger.info("Parsed input parameters")
+        stream = data.get('stream', False)
+        ips = data.get('ips', [])
+        end = data['end']
+
+        if not ips:
+            logger.warning("No IP addresses provided")
+            response = {
+                "overall_success": False,
+                "message": "No IP addresses provided",
+                "results": []
+            }
+        else:
+            controller = LightController()
+            with collect_timings(data.get('timings', False)) as timings:
+                result = await controller.transition_lights(
+                    ips,
+                    end,
+                    data.get('duration', TRANSITION_DURATION),
+                    data.get('start'),
+                    data.get('fps', TRANSITION_FPS),
+                    data.get('deadline', REQUEST_DEADLINE),
+                    stream_result if stream else None
+                )
+            if timings is not None:
+                result["timings"] = timings.summary()
+            response = result
+
+        if stream:
+            stream_summary(response, trace=trace)
+        else:
+            print(dumps_traced(response, trace))
+        logger.info("Response sent")
+    except json.JSONDecodeError as e:
+        logger.error(f"Error parsing JSON input: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Invalid JSON input: {str(e)}",
+            "results": []
+        }))
+    except KeyError as e:
+        logger.error(f"Missing required parameter: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Missing required parameter: {str(e)}",
+            "results": []
+        }))
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Unexpected error: {str(e)}",
+            "results": []
+        }))
+    finally:
+        if controller:
+            await controller.close_connections()
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        logger.error(f"Fatal error: {str(e)}")
+        print(json.dumps({
+            "overall_success": False,
+            "message": f"Fatal error: {str(e)}",
+            "results": []
+        }))
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from pywizlight import wizlight
+from typing import Dict, Any, Callable, Optional
+from config import *
+from pilots import pilot_message
+from fire_and_forget import send_without_ack
+
+logger = logging.getLogger(__name__)
+
+# Spec values that fade linearly between the start and end of a transition
+NUMERIC_KEYS = ('brightness', 'colortemp', 'warm_white', 'cold_white')
+
+def fade_endpoints(start: Dict[str, Any], end: Dict[str, Any]) -> tuple:
+    """Turn 'off' endpoints into zero brightness so fading in or out stays visible."""
+    start_on = start.get('state', True)
+    end_on = end.get('state', True)
+    if not start_on and end_on:
+        start = {**end, "brightness": 0}
+    if start_on and not end_on:
+        end = {**start, "state": True, "brightness": 0}
+    return start, end
+
+def interpolate(start: Dict[str, Any], end: Dict[str, Any], progress: float) -> Dict[str, Any]:
+    """Return the pilot spec at progress (0-1) of a fade from start to end.
+
+    Values present in both specs are interpolated; anything else takes the end
+    value straight away.
+    """
+    if not start.get('state', True) and not end.get('state', True):
+        return {"state": False}
+    start, end = fade_endpoints(start, end)
+    frame = dict(end)
+    for key in NUMERIC_KEYS:
+        if start.get(key) is not None and end.get(key) is not None:
+            frame[key] = round(start[key] + (end[key] - start[key]) * progress)
+    if start.get('rgb') is not None and end.get('rgb') is not None:
+        frame['rgb'] = [round(a + (b - a) * progress) for a, b in zip(start['rgb'], end['rgb'])]
+    return frame
+
+def playback_deadline(request_deadline: Optional[float], reserve: float = TRANSITION_SEND_RESERVE) -> Optional[float]:
+    """Return when frame playback has to stop so the end pilot keeps reserve seconds of the request deadline."""
+    if request_deadline is None:
+        return None
+    return request_deadline - reserve
+
+def valid_fps(fps: Any) -> bool:
+    """Return True for a frame rate playback can run at: a number greater than 0."""
+    return isinstance(fps, (int, float)) and not isinstance(fps, bool) and fps > 0
+
+def playable_fps(fps: float, max_pps: float = BULB_MAX_PPS) -> float:
+    """Clamp a frame rate to the packets per second a bulb may be sent, so no frame is dropped by design."""
+    if fps > max_pps:
+        logger.info(f"Clamping {fps} fps to the bulbs' limit of {max_pps} packets per second")
+        return max_pps
+    return fps
+
+class FramePlayer:
+    """Send per-bulb frames at a fixed frame rate without waiting for acks.
+
+    The frame clock never waits on a bulb: a frame whose time has passed is
+    skipped rather than sent late, and a bulb that already received a packet
+    within the last 1/max_pps seconds skips the frame, so a slow or busy bulb
+    is never sent more than it can take.
+    """
+
+    def __init__(self, fps: float = TRANSITION_FPS, max_pps: float = BULB_MAX_PPS):
+        if not valid_fps(fps):
+            raise ValueError(f"fps must be a number greater than 0, got {fps!r}")
+        self.fps = fps
+        self.max_pps = max_pps
+
+    async def play(
+        self,
+        lights: Dict[str, wizlight],
+        render: Callable[[int], Dict[str, Dict[str, Any]]],
+        frame_count: int,
+        deadline: Optional[float] = None
+    ) -> Dict[str, int]:
+        """Play frames 0..frame_count-1, where render(frame) maps IPs to pilot specs.
+
+        Playback stops at deadline (event loop time), counting the frames left
+        as skipped. Returns packet counts; the caller sends the final state reliably.
+        """
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.fps
+        min_gap = 1 / self.max_pps
+        last_sent = {ip: float('-inf') for ip in lights}
+        sent = 0
+        dropped = 0
+        skipped_frames = 0
+        started = loop.time()
+        frame = 0
+
+        while frame < frame_count:
+            now = loop.time()
+            if deadline is not None and now >= deadline:
+                logger.warning(f"Out of time for the request, stopping playback at frame {frame} of {frame_count}")
+                skipped_frames += frame_count - frame
+                break
+            due = int((now - started) / interval)
+            if due > frame:
+                # Behind schedule: jump to the frame that should be showing now
+                skipped_frames += min(due, frame_count) - frame
+                frame = due
+                if frame >= frame_count:
+                    break
+
+            # Budget against scheduled frame times so clock jitter cannot eat into it
+            frame_time = frame * interval
+            for ip, spec in render(frame).items():
+                if frame_time - last_sent[ip] < min_gap - 1e-9:
+                    dropped += 1
+                    continue
+                try:
+                    await send_without_ack(lights[ip], pilot_message(spec))
+                    last_sent[ip] = frame_time
+                    sent += 1
+                except Exception as e:
+                    logger.warning(f"Could not send frame {frame} to {ip}: {str(e)}")
+                    dropped += 1
+
+            frame += 1
+            await asyncio.sleep(max(0, started + frame * interval - loop.time()))
+
+        if skipped_frames:
+            logger.warning(f"Skipped {skipped_frames} of {frame_count} frame(s)")
+        return {
+            "fps": self.fps,
+            "frames": frame_count,
+            "frames_skipped": skipped_frames,
+            "packets_sent": sent,
+            "packets_dropped": dropped
+        }
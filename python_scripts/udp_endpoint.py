@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from pywizlight import wizlight
+from pywizlight.protocol import WizProtocol
+from typing import Dict, Optional, Tuple, cast
+from config import *
+from tracing import traced_phase
+
+logger = logging.getLogger(__name__)
+
+class SharedEndpoint:
+    """A single UDP socket multiplexing getPilot/setPilot traffic for every bulb.
+
+    Each bulb has one owner light per process, shared by every controller that
+    asks create_light for it. Replies are routed to that owner, which matches
+    the reply's method against its pending request; its send lock keeps one
+    request per bulb in flight, so a reply can only settle the request waiting
+    for it.
+    """
+
+    _endpoint: Optional['SharedEndpoint'] = None
+
+    @classmethod
+    def get(cls) -> 'SharedEndpoint':
+        """Get the endpoint for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if cls._endpoint is None or cls._endpoint.loop is not loop:
+            cls._endpoint = cls(loop)
+        return cls._endpoint
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.lights: Dict[str, wizlight] = {}
+        self.owners: Dict[str, 'SharedEndpointLight'] = {}
+        self.users: Dict[str, int] = {}
+        self.lock = asyncio.Lock()
+
+    @property
+    def size(self) -> int:
+        """Number of lights currently attached."""
+        return len(self.lights)
+
+    def light(self, ip: str) -> 'SharedEndpointLight':
+        """Return the light owning an IP, creating it for its first user."""
+        light = self.owners.get(ip)
+        if light is None:
+            light = self.owners[ip] = SharedEndpointLight(ip, self)
+        self.users[ip] = self.users.get(ip, 0) + 1
+        return light
+
+    def release(self, light: 'SharedEndpointLight') -> bool:
+        """Drop one user of a light and return True once it has none left."""
+        users = self.users.get(light.ip, 1) - 1
+        if users > 0:
+            self.users[light.ip] = users
+            return False
+        self.users.pop(light.ip, None)
+        if self.owners.get(light.ip) is light:
+            del self.owners[light.ip]
+        return True
+
+    async def attach(self, light: wizlight) -> asyncio.DatagramTransport:
+        """Route replies from a light's IP to it and return the shared transport."""
+        async with self.lock:
+            if self.transport is None or self.transport.is_closing():
+                transport, _ = await self.loop.create_datagram_endpoint(
+                    lambda: WizProtocol(on_response=self.on_response, on_error=self.on_error),
+                    local_addr=("0.0.0.0", 0)
+                )
+                self.transport = cast(asyncio.DatagramTransport, transport)
+                logger.debug(f"Opened shared UDP endpoint on {self.transport.get_extra_info('sockname')}")
+            self.lights[light.ip] = light
+            return self.transport
+
+    def detach(self, light: wizlight) -> None:
+        """Stop routing replies to a light and close the socket once no lights remain."""
+        if self.lights.get(light.ip) is light:
+            del self.lights[light.ip]
+        if not self.lights and self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+    def on_response(self, message: bytes, addr: Tuple[str, int]) -> None:
+        """Hand a datagram to the light owning its source address."""
+        light = self.lights.get(addr[0])
+        if light is not None:
+            light._on_response(message, addr)
+
+    def on_error(self, exception: Optional[Exception]) -> None:
+        """Log socket errors; unconnected UDP sockets cannot attribute them to a bulb."""
+        logger.debug(f"Shared UDP endpoint error: {exception}")
+
+class SharedEndpointLight(wizlight):
+    """wizlight that sends and receives through the process-wide SharedEndpoint."""
+
+    def __init__(self, ip: str, endpoint: SharedEndpoint):
+        super().__init__(ip)
+        self.endpoint = endpoint
+
+    async def _ensure_connection(self) -> None:
+        """Attach to the shared endpoint instead of opening a socket per bulb."""
+        if self.transport:
+            return
+        with traced_phase('connect'):
+            self.transport = await self.endpoint.attach(self)
+
+    def _async_close(self):
+        """Detach from the shared endpoint once its last user closes it, keeping the shared socket open."""
+        if not self.endpoint.release(self):
+            return
+        self.push_running = False
+        if self.transport:
+            self.endpoint.detach(self)
+            self.transport = None
+        if self.push_cancel:
+            self.push_cancel()
+            self.push_cancel = None
+
+def create_light(ip: str) -> wizlight:
+    """Create a light connection, multiplexed over the shared endpoint when enabled.
+
+    With the shared endpoint every caller in a process gets the same light for
+    an IP and must close it once when done with it.
+    """
+    if SHARED_UDP_ENDPOINT:
+        return SharedEndpoint.get().light(ip)
+    return wizlight(ip)